@@ -66,6 +66,13 @@ export class ApiService {
   }
 
 
+  // Dashboard endpoint
+  getDashboard(): Observable<{ success: boolean; websites: Website[]; active_tasks: any[]; subscription: any; usage: any; recent_backups: any[] }> {
+    return this.http.get<{ success: boolean; websites: Website[]; active_tasks: any[]; subscription: any; usage: any; recent_backups: any[] }>(
+      `${this.baseUrl}/dashboard`
+    );
+  }
+
   // Website endpoints
   getWebsites(): Observable<{ success: boolean; websites: Website[] }> {
     return this.http.get<{ success: boolean; websites: Website[] }>(`${this.baseUrl}/websites`);
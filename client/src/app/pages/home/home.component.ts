@@ -44,11 +44,14 @@ export class HomeComponent implements OnInit {
   loadDashboardData() {
     this.isLoading = true;
 
-    // Load websites
-    this.apiService.getWebsites().subscribe({
+    // Websites and quota in a single request
+    this.apiService.getDashboard().subscribe({
       next: (response) => {
         if (response.success) {
           this.websites = response.websites;
+          if (response.usage) {
+            this.stats.diskQuota = response.usage.storage_limit_gb * 1024;
+          }
           this.calculateStats();
         }
         this.isLoading = false;
@@ -0,0 +1,28 @@
+"""subscription period end index
+
+Revision ID: 2b9f6d03e1c4
+Revises: 8e41c2a7d5b3
+Create Date: 2026-10-19 10:02:17.861094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b9f6d03e1c4'
+down_revision: Union[str, Sequence[str], None] = '8e41c2a7d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_subscriptions_status_period_end', 'subscriptions', ['status', 'current_period_end'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_subscriptions_status_period_end', table_name='subscriptions')
@@ -0,0 +1,40 @@
+"""added change journal table
+
+Revision ID: 5c7e2a9d4f10
+Revises: 2b9f6d03e1c4
+Create Date: 2026-10-19 11:24:51.402317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7e2a9d4f10'
+down_revision: Union[str, Sequence[str], None] = '2b9f6d03e1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('change_journal',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_change_journal_user_version', 'change_journal', ['user_id', 'id'], unique=False)
+    op.create_index('ix_change_journal_entity', 'change_journal', ['user_id', 'entity', 'entity_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_change_journal_entity', table_name='change_journal')
+    op.drop_index('ix_change_journal_user_version', table_name='change_journal')
+    op.drop_table('change_journal')
@@ -0,0 +1,48 @@
+"""added fleet_rollups table
+
+Revision ID: 8e41c2a7d5b3
+Revises: 663736c69eaa
+Create Date: 2026-10-19 09:12:31.504211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41c2a7d5b3'
+down_revision: Union[str, Sequence[str], None] = '663736c69eaa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fleet_rollups',
+    sa.Column('metric', sa.String(length=50), nullable=False),
+    sa.Column('bucket', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('metric', 'bucket')
+    )
+
+    # Seed the counters from the existing rows
+    op.execute("""
+        INSERT INTO fleet_rollups (metric, bucket, count)
+        SELECT 'websites.status', status, COUNT(*) FROM websites GROUP BY status
+        UNION ALL
+        SELECT 'tasks.status', status, COUNT(*) FROM tasks GROUP BY status
+        UNION ALL
+        SELECT 'tasks.type', task_type, COUNT(*) FROM tasks GROUP BY task_type
+        UNION ALL
+        SELECT 'users.role', role, COUNT(*) FROM users GROUP BY role
+        UNION ALL
+        SELECT 'subscriptions.plan', CAST(plan_id AS CHAR), COUNT(*) FROM subscriptions
+        WHERE status = 'active' GROUP BY plan_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('fleet_rollups')
@@ -0,0 +1,37 @@
+"""admin search fulltext indexes
+
+Revision ID: 9a3f5d81b6e2
+Revises: 5c7e2a9d4f10
+Create Date: 2026-10-19 12:41:06.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f5d81b6e2'
+down_revision: Union[str, Sequence[str], None] = '5c7e2a9d4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The ngram parser indexes every 2-character sequence (ngram_token_size),
+    # which gives substring and typo-tolerant matching on names and domains
+    op.create_index('ft_users_search', 'users', ['email', 'first_name', 'last_name'], unique=False, mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
+    op.create_index('ft_websites_search', 'websites', ['name'], unique=False, mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
+    op.create_index('ft_domains_search', 'domains', ['domain_name'], unique=False, mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
+    # B-tree index for prefix matching (LIKE 'q%')
+    op.create_index(op.f('ix_websites_name'), 'websites', ['name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_websites_name'), table_name='websites')
+    op.drop_index('ft_domains_search', table_name='domains')
+    op.drop_index('ft_websites_search', table_name='websites')
+    op.drop_index('ft_users_search', table_name='users')
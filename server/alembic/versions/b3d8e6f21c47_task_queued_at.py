@@ -0,0 +1,30 @@
+"""task queued_at
+
+Revision ID: b3d8e6f21c47
+Revises: 9a3f5d81b6e2
+Create Date: 2026-10-19 15:08:43.215907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d8e6f21c47'
+down_revision: Union[str, Sequence[str], None] = '9a3f5d81b6e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('queued_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE tasks SET queued_at = created_at")
+    op.alter_column('tasks', 'queued_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tasks', 'queued_at')
@@ -0,0 +1,93 @@
+"""
+Cold start: import time breakdown and time to the first request
+
+Usage: python benchmarks/bench_cold_start.py [runs]
+No database is needed: the engine is created by the lifespan but only
+connects on the first query, and GET / does not query.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import http.client
+from collections import defaultdict
+from statistics import median
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+STARTUP_TIMEOUT = 30  # seconds
+
+
+def _env():
+    env = dict(os.environ, PYTHONPATH=SERVER_DIR)
+    env.setdefault("DB_PASSWORD", "benchmark")
+    return env
+
+
+def import_breakdown(top: int = 12):
+    """Self time of `import main` per top-level package, from -X importtime"""
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=cwd, env=_env(), capture_output=True, text=True, check=True
+        )
+
+    packages = defaultdict(int)
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+        if name.strip() == "main":
+            total = int(cumulative_us)
+
+    print(f"import main: {total / 1000:.1f} ms cumulative\n")
+    print(f"  {'package':<24} {'self ms':>9}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<24} {self_us / 1000:>9.1f}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request() -> float:
+    """Seconds from spawning a server process to the first 200 on GET /"""
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as cwd:
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=cwd, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while time.perf_counter() - start < STARTUP_TIMEOUT:
+                try:
+                    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                    connection.request("GET", "/")
+                    if connection.getresponse().status == 200:
+                        return time.perf_counter() - start
+                except OSError:
+                    time.sleep(0.005)
+            raise TimeoutError("the server did not answer")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    import_breakdown()
+
+    samples = [time_to_first_request() for _ in range(runs)]
+    print(f"\ntime to first request over {runs} runs: "
+          f"median {median(samples) * 1000:.0f} ms, best {min(samples) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
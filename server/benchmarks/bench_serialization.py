@@ -0,0 +1,77 @@
+"""
+Listing serialization throughput: to_dict() + json vs orjson vs typed models
+
+Usage: python benchmarks/bench_serialization.py [rows]
+No database is needed, the ORM objects are built in memory.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+os.environ.setdefault("DB_PASSWORD", "benchmark")
+
+from pydantic import TypeAdapter
+
+from src.models import Website, WebsiteStatus, Task, TaskType, TaskStatus
+from src.schemas import WebsiteListEnvelope, TaskListEnvelope
+from src.serialization import dumps
+
+
+def make_websites(count: int):
+    now = datetime.utcnow()
+    return [
+        Website(
+            id=i, user_id=1, name=f"site{i}.example.com", status=WebsiteStatus.ACTIVE,
+            site_path=f"/home/1/site{i}.example.com", disk_quota=1024, disk_usage=i % 1024,
+            backup_enabled=True, backup_frequency="daily", backup_retention_days=30,
+            last_backup_at=now, created_at=now - timedelta(days=i), suspended_at=None,
+        )
+        for i in range(count)
+    ]
+
+
+def make_tasks(count: int):
+    now = datetime.utcnow()
+    return [
+        Task(
+            id=i, user_id=1, website_id=i, task_type=TaskType.BACKUP_CREATE,
+            status=TaskStatus.COMPLETED, title=f"Creating backup for site{i}.example.com",
+            description="Backing up files and database", progress=100,
+            current_step="Storing backup", total_steps=1, error_message=None,
+            created_at=now, started_at=now, completed_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def bench(label: str, fn, rows: int, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<34} {best * 1000:8.2f} ms  {rows / best:>12,.0f} rows/s  {len(payload):>10,} bytes")
+
+
+def run(name: str, key: str, objects, envelope):
+    rows = len(objects)
+    adapter = TypeAdapter(envelope)
+    print(f"{name} ({rows:,} rows)")
+    prebuilt = {"success": True, key: [o.to_dict() for o in objects]}
+    bench("encode only: json.dumps", lambda: json.dumps(prebuilt).encode(), rows)
+    bench("encode only: orjson", lambda: dumps(prebuilt), rows)
+    bench("to_dict() + json.dumps", lambda: json.dumps({"success": True, key: [o.to_dict() for o in objects]}).encode(), rows)
+    bench("to_dict() + orjson", lambda: dumps({"success": True, key: [o.to_dict() for o in objects]}), rows)
+    bench("typed model (validate + dump_json)", lambda: adapter.dump_json(
+        adapter.validate_python({"success": True, key: objects}, from_attributes=True)
+    ), rows)
+
+
+if (__name__ == "__main__"):
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    run("Websites", "websites", make_websites(count), WebsiteListEnvelope)
+    run("Tasks", "tasks", make_tasks(count), TaskListEnvelope)
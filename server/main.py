@@ -1,16 +1,19 @@
-import argparse
-import asyncio
-from math import *
-import uvicorn
-import src.Colors as clr
-from fastapi import FastAPI, HTTPException, Depends, Header, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse, FileResponse
-from fastapi.middleware.cors import CORSMiddleware
 import os
 import sys
+
+if (__name__=="__main__"):
+    # python -m src.launcher is the entry point, kept for compatibility. Run
+    # in a fresh interpreter before anything is imported here: the launcher
+    # sets PROMETHEUS_MULTIPROC_DIR, which must happen before prometheus_client loads
+    server_dir = os.path.dirname(os.path.realpath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [server_dir, os.getenv("PYTHONPATH")])))
+    os.execve(sys.executable, [sys.executable, "-m", "src.launcher", *sys.argv[1:]], env)
+
+import asyncio
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 
 from routes.user import router as user_router
 from routes.auth import router as auth_router
@@ -18,84 +21,83 @@ from routes.websites import router as websites_router
 from routes.hosting import router as hosting_router
 from routes.backups import router as backups_router
 from routes.tasks import router as tasks_router
-
-MAX_LINE_LENGTH = 65
-
-host = "0.0.0.0"
-port = 21580
-dbg = True
-wdir = os.path.dirname(os.path.realpath(__file__))
-workersnb = 4 if not dbg else 1
+from routes.admin import router as admin_router
+from routes.dashboard import router as dashboard_router
+from routes.sync import router as sync_router
+from routes.health import router as health_router
+from routes.metrics import router as metrics_router
+
+from src.billing import run_billing_scheduler
+from src.journal import run_journal_compactor
+from src.task_queue import run_task_recovery
+from src.metrics import MetricsMiddleware, run_sampler
+from src.loop_monitor import loop_monitor, blocked_log
+from src import tracing
+from src.continuous_profiler import continuous_profiler, enabled as profiler_enabled
+from src.access_log import AccessLogMiddleware, access_log_sink
+from src.serialization import FastJSONResponse
+from src.idempotency import IdempotencyMiddleware
+from src.profiling import ProfilingMiddleware
+from src.concurrency import ConcurrencyLimitMiddleware
+from src.static_client import ClientBuild, StaticClientMiddleware
+from src.lifecycle import worker, warm_up
+
+dbg = os.getenv("DEBUG", "0") == "1"  # Set by the launcher with --debug
+access_log_sample_rate = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+idempotency_window = int(os.getenv("IDEMPOTENCY_WINDOW", "86400"))  # seconds
+gzip_minimum_size = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))  # bytes
+# Production build of the client, e.g. ../client/dist/hosting-panel/browser
+client_dist = os.getenv("CLIENT_DIST")
+client_build = ClientBuild(client_dist) if client_dist else None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     #asyncio.create_task(test_events())
-
+    if client_build:
+        await asyncio.to_thread(client_build.load)
+    # Before the worker accepts connections: the first requests do not pay
+    # for connecting, compiling the statements or filling the caches
+    await warm_up()
+    worker.run_in_background("billing_scheduler", run_billing_scheduler())
+    worker.run_in_background("journal_compactor", run_journal_compactor())
+    worker.run_in_background("task_recovery", run_task_recovery())
+    worker.run_in_background("metrics_sampler", run_sampler())
+    worker.run_in_background("loop_monitor", loop_monitor.run())
+    if profiler_enabled:
+        continuous_profiler.start()
+    worker.install_signal_handler()
 
     print("🟢 Server is up and ready\n")
 
     yield
 
     print("⛔ Shutting down the Server...\n")
-
-
-
-class RequestLoggerMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if (not "text/event-stream" in request.headers.get("Accept", "")):
-            mtcl = {"GET": clr.NONE, "POST":clr.MAGENTA, "PUT":clr.LIGHT_GREEN, "OPTIONS":clr.LIGHT_CYAN}
-            print(f"{mtcl[request.method] if request.method in mtcl.keys() else clr.NONE}[{request.method}]{clr.NONE}", end='')
-            
-            host = str(request.base_url)
-            if ("://" in host):
-                host=host.split("://")[1]
-            host=host.split("/")[0]
-            endpoint=str(request.url).split(host)[1]
-
-            host=host.split(":")[0]
-
-            print(f" {host} : {endpoint} ->", end='')
-            
-            response = await call_next(request)
-            body = b"".join([chunk async for chunk in response.body_iterator])
-
-            rpc=clr.NONE
-            if response.status_code<300: # GOOD
-                rpc=clr.GREEN
-            elif response.status_code<400: # REDIRECTION
-                rpc=clr.LIGHT_BLACK
-            elif response.status_code<500: # BAD
-                rpc=clr.LIGHT_RED
-            else: # SERVER ERROR
-                rpc=clr.RED
-            print(f" {rpc}{response.status_code}{clr.NONE}")
-
-            try:
-                bdd = body.decode(errors="replace")
-                print(f"   -> {bdd[:100]}{'...' if len(bdd)>100 else ''}\n")
-            except Exception as e:
-                pass
-            
-            async def response_stream():
-                yield body
-
-            return StreamingResponse(response_stream(), 
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type
-            )
-        else:
-            response = await call_next(request)
-            return(response)
-
-
-
-
-
-
-
-app = FastAPI(lifespan=lifespan)
+    # Already started by SIGUSR2 or SIGTERM through the launcher, if so
+    await worker.start_drain()
+    worker.stop_background()
+    continuous_profiler.stop()
+    access_log_sink.close()
+    blocked_log.close()
+    tracing.exporter.close()
+
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Innermost, so that a profile only holds the request's own work
+app.add_middleware(ProfilingMiddleware)
+# Sheds load before any work is done, but inside CORS so browsers can read the 503
+app.add_middleware(ConcurrencyLimitMiddleware)
+# Inside CORS, so that replayed responses get the CORS headers too. Outside the
+# limiter: duplicates waiting on a claim or replayed hold no slot, and their
+# wait does not count as latency
+app.add_middleware(IdempotencyMiddleware, ttl=idempotency_window)
+# Skips responses already encoded, like the precompressed client files, and
+# by content type SSE streams and gzip exports (starlette>=1.5)
+app.add_middleware(GZipMiddleware, minimum_size=gzip_minimum_size)
+if client_build:
+    app.add_middleware(StaticClientMiddleware, build=client_build)
 
 # CORS middleware must be added BEFORE routes
 if (dbg):
@@ -106,7 +108,6 @@ if (dbg):
         allow_methods=["*"],  # Allows all HTTP methods (GET, POST, etc.)
         allow_headers=["*"],  # Allows all headers
     )
-    app.add_middleware(RequestLoggerMiddleware)
 else:
     # Production CORS - only allow your frontend domain
     app.add_middleware(
@@ -122,6 +123,14 @@ else:
         allow_headers=["*"],
     )
 
+# Outside everything but the access log, so that shed and replayed requests count
+app.add_middleware(MetricsMiddleware)
+if tracing.enabled:
+    # Outside everything but the access log, so that the span covers the whole stack
+    app.add_middleware(tracing.TracingMiddleware)
+# Outermost, so that the logged duration covers the whole stack
+app.add_middleware(AccessLogMiddleware, sample_rate=access_log_sample_rate)
+
 # Routes (added after middleware)
 app.include_router(user_router, prefix="/user", tags=["User"])
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
@@ -129,6 +138,11 @@ app.include_router(websites_router, prefix="/websites", tags=["Websites"])
 app.include_router(hosting_router, prefix="/hosting", tags=["Hosting"])
 app.include_router(backups_router, prefix="/backups", tags=["Backups"])
 app.include_router(tasks_router, prefix="/tasks", tags=["Tasks"])
+app.include_router(admin_router, prefix="/admin", tags=["Admin"])
+app.include_router(dashboard_router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(sync_router, prefix="/sync", tags=["Sync"])
+app.include_router(health_router, tags=["Health"])
+app.include_router(metrics_router, tags=["Metrics"])
 
 # Endpoints
 @app.get("/")
@@ -140,64 +154,3 @@ def none_handler():
 
 
 
-
-if (__name__=="__main__"):
-    # SSL configuration
-    use_ssl = True  # Set to True to enable SSL, False to disable
-    ssl_keyfile = os.path.join(wdir, "certs/key.pem") if use_ssl else None
-    ssl_certfile = os.path.join(wdir, "certs/cert.pem") if use_ssl else None
-
-    protocol = "https" if use_ssl else "http"
-    print(f"🚀 Starting the SoundPool server on {clr.CYAN}{protocol}://{host}:{port}{clr.NONE}.\n")
-
-    if (dbg):
-        print(f"⚠️ {clr.YELLOW}Warning{clr.NONE}, DEBUG mode is activated. \n{clr.LIGHT_RED}Do not use this mode for production!{clr.NONE}")
-        pll = MAX_LINE_LENGTH+16
-        print(f"{clr.YELLOW}╔{'═'*pll}{clr.NONE}")
-
-        debug_messages = [
-            f"The number of workers was reduced to {clr.LIGHT_RED}{workersnb}{clr.NONE}",
-            f"The CORS wildcard is activated.",
-            f"The DEBUG middleware is activated.",
-            f"The server will reload on changes in {clr.UNDERLINE}{wdir}{clr.NONE}"
-        ]
-
-        if use_ssl:
-            debug_messages.append(f"SSL enabled with {clr.LIGHT_RED}self-signed{clr.NONE} certificate")
-
-        for ll in debug_messages:
-            if (len(ll) > MAX_LINE_LENGTH):
-                print(f"{clr.YELLOW}║{clr.NONE} ", end="")
-
-                print(ll[:MAX_LINE_LENGTH])
-                lcl=clr.lastUsed(ll[:MAX_LINE_LENGTH])
-                for i in range(1, floor(len(ll)/(MAX_LINE_LENGTH+1))+1):
-                    print(f"{clr.NONE}{clr.YELLOW}║{clr.NONE} ", end="")
-                    print((" "*5)+lcl+ll[(MAX_LINE_LENGTH*i):(MAX_LINE_LENGTH*(i+1))]+clr.NONE)
-                    lcl=clr.lastUsed(ll[(MAX_LINE_LENGTH*i):(MAX_LINE_LENGTH*(i+1))])
-            else:
-                print(f"{clr.YELLOW}║{clr.NONE} {ll}")
-
-        print(f"{clr.YELLOW}╚{'═'*pll}{clr.NONE}\n")
-    else:
-        if (workersnb<3):
-            print(f"⚠️ {clr.YELLOW}Warning{clr.NONE}, for a production environment, {workersnb} workers might not be enough.")
-        else:
-            print(f"⛏️ Running {workersnb} workers")
-
-    if use_ssl:
-        print(f"🔒 SSL/HTTPS enabled\n")
-
-    print("")
-
-    uvicorn.run(
-        "main:app",
-        host=host,
-        port=port,
-        reload=dbg,
-        workers=workersnb,
-        log_level="warning",
-        access_log=dbg,
-        ssl_keyfile=ssl_keyfile,
-        ssl_certfile=ssl_certfile
-    )
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""
+Admin-only fleet management routes
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
+
+from routes.auth import get_current_admin_user
+from src.models import User, Task, TaskType, TaskStatus
+from src.database import get_db
+from src import rollups
+from src.tiered_cache import TieredCache
+from src.concurrency import limiters
+from src.exports import EXPORTS, FORMATS, export
+from src.schemas import SearchEnvelope
+from src.serialization import dumps
+from src.search import search
+from src.lifecycle import worker
+from src import profiling, continuous_profiler
+from src.task_telemetry import task_telemetry, WINDOWS
+
+router = APIRouter()
+
+
+@router.get("/overview", response_model=dict)
+async def get_fleet_overview(current_user: User = Depends(get_current_admin_user)):
+    """Fleet-wide counters by status, type, role and plan"""
+    with get_db() as db:
+        return {
+            "success": True,
+            "overview": rollups.overview(db)
+        }
+
+
+@router.post("/overview/rebuild", response_model=dict)
+async def rebuild_fleet_overview(current_user: User = Depends(get_current_admin_user)):
+    """Recompute the fleet counters from scratch"""
+    with get_db() as db:
+        rollups.rebuild(db)
+
+        return {
+            "success": True,
+            "message": "Fleet overview rebuilt",
+            "overview": rollups.overview(db)
+        }
+
+
+@router.get("/cache", response_model=dict)
+async def get_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """Hit, miss and coalescing counters of this worker's caches"""
+    return {
+        "success": True,
+        "worker": os.getpid(),
+        "caches": [tiered.stats() for tiered in TieredCache.instances]
+    }
+
+
+@router.get("/concurrency", response_model=dict)
+async def get_concurrency_limits(current_user: User = Depends(get_current_admin_user)):
+    """Current adaptive limits and shedding counters of this worker"""
+    return {
+        "success": True,
+        "worker": os.getpid(),
+        "groups": [limiter.stats() for limiter in limiters.values()]
+    }
+
+
+@router.post("/drain", response_model=dict)
+async def drain_worker(current_user: User = Depends(get_current_admin_user)):
+    """
+    Drain the worker answering this request: readiness turns false, SSE
+    clients are sent elsewhere and running tasks finish or are checkpointed.
+    Returns right away, GET /readyz on this worker reports the state.
+    """
+    worker.start_drain()
+    return {
+        "success": True,
+        "worker": os.getpid(),
+        "draining": True
+    }
+
+
+@router.get("/tasks/telemetry", response_model=dict)
+async def get_task_telemetry(current_user: User = Depends(get_current_admin_user)):
+    """
+    Per task type: tasks running now, and over the last hour and day the
+    runs by outcome, failure rate, queue wait, run time and step duration
+    percentiles (seconds) and the average concurrency
+    """
+    with get_db() as db:
+        running = dict(
+            db.query(Task.task_type, func.count(Task.id))
+            .filter(Task.status == TaskStatus.RUNNING)
+            .group_by(Task.task_type)
+            .all()
+        )
+
+    task_types = [task_type.value for task_type in TaskType]
+    summary = await asyncio.to_thread(
+        task_telemetry.summary, task_types, {task_type.value: count for task_type, count in running.items()}
+    )
+    return {
+        "success": True,
+        "windows": list(WINDOWS),
+        "task_types": summary
+    }
+
+
+@router.get("/profiles", response_model=dict)
+async def list_profiles(current_user: User = Depends(get_current_admin_user)):
+    """Latest request profiles, taken with the X-Profile header"""
+    return {
+        "success": True,
+        "profiles": profiling.recent()
+    }
+
+
+PROFILE_FORMATS = ("summary", "speedscope", "collapsed")
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    fmt: str = Query("summary", alias="format"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    A request profile: summary with the SQL time per statement, or a
+    download for speedscope.app or flamegraph.pl (collapsed stacks)
+    """
+    if fmt not in PROFILE_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown format, available: {', '.join(PROFILE_FORMATS)}"
+        )
+    profile = profiling.load(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found or expired"
+        )
+
+    if fmt == "summary":
+        return {
+            "success": True,
+            "profile": {key: value for key, value in profile.items() if key != "stacks"}
+        }
+
+    stacks = {tuple(stack): count for stack, count in profile["stacks"]}
+    if fmt == "speedscope":
+        name = f"{profile['method']} {profile['path']} ({profile['duration_ms']} ms)"
+        content = dumps(profiling.to_speedscope(stacks, name, profile["interval_ms"]))
+        media_type, extension = "application/json", "speedscope.json"
+    else:
+        content = profiling.to_collapsed(stacks)
+        media_type, extension = "text/plain", "folded"
+    return Response(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.{extension}"'}
+    )
+
+
+@router.get("/profiler", response_model=dict)
+async def get_profiler_status(current_user: User = Depends(get_current_admin_user)):
+    """Continuous profiler state, and fleet totals over the last hour"""
+    end = datetime.utcnow()
+    _, totals = await asyncio.to_thread(continuous_profiler.merged, end - timedelta(hours=1), end)
+    return {
+        "success": True,
+        "profiler": continuous_profiler.status(),
+        "last_hour": totals
+    }
+
+
+@router.get("/profiler/flamegraph")
+async def get_profiler_flamegraph(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fmt: str = Query("speedscope", alias="format"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Stacks sampled by every worker between start and end (UTC, the last
+    hour by default), merged, for speedscope.app or flamegraph.pl.
+    Weights are milliseconds of samples.
+    """
+    if fmt not in PROFILE_FORMATS[1:]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown format, available: {', '.join(PROFILE_FORMATS[1:])}"
+        )
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=1)
+    if start >= end or end - start > timedelta(seconds=continuous_profiler.RETENTION):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"start must be before end, by at most {continuous_profiler.RETENTION} seconds"
+        )
+
+    stacks, totals = await asyncio.to_thread(continuous_profiler.merged, start, end)
+    if not stacks:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No samples in this range, is PROFILER_HZ set?"
+        )
+
+    name = f"fleet {start:%Y-%m-%d %H:%M} - {end:%H:%M} UTC ({totals['samples']} samples)"
+    if fmt == "speedscope":
+        content = await asyncio.to_thread(lambda: dumps(profiling.to_speedscope(stacks, name, 1)))
+        media_type, extension = "application/json", "speedscope.json"
+    else:
+        content = await asyncio.to_thread(profiling.to_collapsed, stacks)
+        media_type, extension = "text/plain", "folded"
+    filename = f"cpu-{start:%Y%m%d-%H%M}-{end:%Y%m%d-%H%M}.{extension}"
+    return Response(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/export/{resource}")
+async def export_table(
+    resource: str,
+    fmt: str = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Stream users, websites, tasks or activity_logs as NDJSON or CSV"""
+    if resource not in EXPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export, available: {', '.join(EXPORTS)}"
+        )
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown format, available: {', '.join(FORMATS)}"
+        )
+
+    filename = f"{resource}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export(resource, fmt, since, compress=gzip),
+        # GZipMiddleware leaves application/gzip alone, see requirements.txt
+        media_type="application/gzip" if gzip else FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/search", response_model=SearchEnvelope)
+async def search_accounts(
+    q: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Find users by email or name, websites by name and domains"""
+    with get_db() as db:
+        return {
+            "success": True,
+            **search(db, q, limit)
+        }
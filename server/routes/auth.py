@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Header, APIRouter
+from fastapi import FastAPI, Depends, HTTPException, status, Header, APIRouter, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
 from typing import Optional
@@ -7,6 +7,8 @@ from typing import Optional
 from src.crypto import AuthService, AuthError, extract_token_from_header
 from src.models import *
 from src.database import get_db
+from src.schemas import UserEnvelope, UserListEnvelope, WebsiteListEnvelope
+from src import versions
 
 router = APIRouter()
 
@@ -125,6 +127,50 @@ def require_role(*roles: UserRole):
     return check_role
 
 
+def conditional_get(*collections: str):
+    """
+    Dependency factory for conditional GETs on per-user collections
+
+    Answers a matching If-None-Match with 304 from the JWT, the version
+    counters and the cached is_active flag, before the user is loaded from
+    the database. A disabled account stops getting 304s within
+    ACTIVE_FLAG_TTL seconds. Must be declared before get_current_user in
+    the route signature.
+
+    Usage:
+        @router.get("/websites")
+        async def websites(
+            _: None = Depends(conditional_get("websites")),
+            current_user: User = Depends(get_current_user)
+        ):
+            ...
+    """
+    async def check_etag(
+        request: Request,
+        response: Response,
+        credentials: HTTPAuthorizationCredentials = Depends(security)
+    ):
+        try:
+            payload = AuthService.verify_token(credentials.credentials, 'access')
+        except AuthError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.message)
+
+        user_id = payload.get('user_id')
+        etag = versions.etag(user_id, collections)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if versions.etag_matches(request.headers.get("if-none-match"), etag):
+            active = AuthService.cached_is_active(user_id)
+            if active is False:
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is disabled")
+            if active:
+                raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            # Unknown: get_current_user loads the user and answers in full
+
+        response.headers.update(headers)
+    return check_etag
+
+
 # Public routes
 
 @router.post("/register", response_model=dict, status_code=status.HTTP_201_CREATED)
@@ -228,12 +274,12 @@ async def reset_password(data: ResetPasswordRequest):
 
 # Protected routes
 
-@router.get("/me", response_model=dict)
+@router.get("/me", response_model=UserEnvelope)
 async def get_me(current_user: User = Depends(get_current_user)):
     """Get current user info"""
     return {
         "success": True,
-        "user": current_user.to_dict()
+        "user": current_user
     }
 
 
@@ -276,7 +322,7 @@ async def logout(current_user: User = Depends(get_current_user)):
 
 
 # Protected route example
-@router.get("/api/websites", response_model=dict)
+@router.get("/api/websites", response_model=WebsiteListEnvelope)
 async def get_websites(current_user: User = Depends(get_current_user)):
     """Get user's websites"""
     with get_db() as db:
@@ -289,12 +335,12 @@ async def get_websites(current_user: User = Depends(get_current_user)):
 
         return {
             "success": True,
-            "websites": [w.to_dict() for w in websites]
+            "websites": websites
         }
 
 
 # Admin-only route example
-@router.get("/api/admin/users", response_model=dict)
+@router.get("/api/admin/users", response_model=UserListEnvelope)
 async def get_all_users(current_user: User = Depends(get_current_admin_user)):
     """Get all users (admin only)"""
     with get_db() as db:
@@ -302,7 +348,7 @@ async def get_all_users(current_user: User = Depends(get_current_admin_user)):
         
         return {
             "success": True,
-            "users": [u.to_dict() for u in users]
+            "users": users
         }
 
 
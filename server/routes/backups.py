@@ -2,15 +2,19 @@
 Backup management routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 
-from routes.auth import get_current_user
+from routes.auth import get_current_user, conditional_get
 from src.models import User, Website, Backup, TaskType
 from src.database import get_db
 from src.task_queue import task_queue
+from src.schemas import BackupOut, BackupEnvelope, BackupListEnvelope
+from src import versions
+from src.response_cache import invalidate
+from src.projection import parse_fields, project, sparse_response
 
 router = APIRouter()
 
@@ -21,15 +25,20 @@ class CreateBackupRequest(BaseModel):
     encrypt: bool = False
 
 
-@router.get("/backups", response_model=dict)
+@router.get("/backups", response_model=BackupListEnvelope)
 async def get_backups(
+    response: Response,
     website_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    _: None = Depends(conditional_get("backups")),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all backups for the current user"""
+    """Get all backups for the current user, optionally only some fields"""
+    columns = parse_fields(fields, Backup, BackupOut)
+
     with get_db() as db:
         # First, get user's websites to ensure they own them
-        user_website_ids = [w.id for w in db.query(Website).filter(
+        user_website_ids = [row.id for row in db.query(Website.id).filter(
             Website.user_id == current_user.id
         ).all()]
 
@@ -43,15 +52,19 @@ async def get_backups(
                 )
             query = query.filter(Backup.website_id == website_id)
 
-        backups = query.order_by(Backup.created_at.desc()).limit(100).all()
+        query = query.order_by(Backup.created_at.desc()).limit(100)
+        if columns:
+            return sparse_response(response, backups=project(query, Backup, columns))
+
+        backups = query.all()
 
         return {
             "success": True,
-            "backups": [backup.to_dict() for backup in backups]
+            "backups": backups
         }
 
 
-@router.get("/backups/{backup_id}", response_model=dict)
+@router.get("/backups/{backup_id}", response_model=BackupEnvelope)
 async def get_backup(
     backup_id: int,
     current_user: User = Depends(get_current_user)
@@ -80,7 +93,7 @@ async def get_backup(
 
         return {
             "success": True,
-            "backup": backup.to_dict()
+            "backup": backup
         }
 
 
@@ -113,6 +126,9 @@ async def create_backup(
         db.refresh(backup)
         backup_id = backup.id
 
+    versions.bump(current_user.id, "backups")
+    invalidate(f"website:{data.website_id}")
+
     # Queue background task for backup creation
     task = await task_queue.enqueue_task(
         user_id=current_user.id,
@@ -165,6 +181,8 @@ async def delete_backup(
         # Delete backup
         db.delete(backup)
         db.commit()
+        versions.bump(current_user.id, "backups")
+        invalidate(f"website:{backup.website_id}")
 
         return {
             "success": True,
@@ -219,7 +237,7 @@ async def restore_backup(
     }
 
 
-@router.get("/websites/{website_id}/backups", response_model=dict)
+@router.get("/websites/{website_id}/backups", response_model=BackupListEnvelope)
 async def get_website_backups(
     website_id: int,
     current_user: User = Depends(get_current_user)
@@ -244,5 +262,5 @@ async def get_website_backups(
 
         return {
             "success": True,
-            "backups": [backup.to_dict() for backup in backups]
+            "backups": backups
         }
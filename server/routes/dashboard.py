@@ -0,0 +1,86 @@
+"""
+Aggregated home page data in a single round trip
+"""
+
+import asyncio
+
+from fastapi import APIRouter, Depends
+
+from routes.auth import get_current_user, conditional_get
+from src.models import User, Website, Task, TaskStatus, Backup, Subscription
+from src.database import get_db
+from src.schemas import WebsiteOut, TaskOut, BackupOut, SubscriptionOut, DashboardEnvelope
+
+router = APIRouter()
+
+RECENT_BACKUPS = 5
+
+
+# Each loader opens its own session and runs in a worker thread, so the
+# queries run concurrently. Results are validated before the session closes,
+# while lazy relationships can still load.
+
+def _load_websites(user_id: int):
+    with get_db() as db:
+        websites = db.query(Website).filter(
+            Website.user_id == user_id
+        ).order_by(Website.created_at.desc()).all()
+        return [WebsiteOut.model_validate(w) for w in websites]
+
+
+def _load_active_tasks(user_id: int):
+    with get_db() as db:
+        tasks = db.query(Task).filter(
+            Task.user_id == user_id,
+            Task.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING])
+        ).order_by(Task.created_at.desc()).all()
+        return [TaskOut.model_validate(t) for t in tasks]
+
+
+def _load_subscription(user_id: int):
+    with get_db() as db:
+        subscription = db.query(Subscription).filter(
+            Subscription.user_id == user_id,
+            Subscription.status == "active"
+        ).first()
+        return SubscriptionOut.model_validate(subscription) if subscription else None
+
+
+def _load_recent_backups(user_id: int):
+    with get_db() as db:
+        backups = db.query(Backup).join(Website).filter(
+            Website.user_id == user_id
+        ).order_by(Backup.created_at.desc()).limit(RECENT_BACKUPS).all()
+        return [BackupOut.model_validate(b) for b in backups]
+
+
+@router.get("", response_model=DashboardEnvelope)
+async def get_dashboard(
+    _: None = Depends(conditional_get("websites", "tasks", "subscription", "backups", "plans")),
+    current_user: User = Depends(get_current_user)
+):
+    """Websites, active tasks, subscription with usage and recent backups"""
+    websites, active_tasks, subscription, recent_backups = await asyncio.gather(
+        asyncio.to_thread(_load_websites, current_user.id),
+        asyncio.to_thread(_load_active_tasks, current_user.id),
+        asyncio.to_thread(_load_subscription, current_user.id),
+        asyncio.to_thread(_load_recent_backups, current_user.id),
+    )
+
+    usage = None
+    if subscription and subscription.plan:
+        usage = {
+            "websites_used": len(websites),
+            "websites_limit": subscription.plan.features.websites,
+            "storage_used_mb": sum(w.disk_usage for w in websites),
+            "storage_limit_gb": subscription.plan.features.storage,
+        }
+
+    return {
+        "success": True,
+        "websites": websites,
+        "active_tasks": active_tasks,
+        "subscription": subscription,
+        "usage": usage,
+        "recent_backups": recent_backups
+    }
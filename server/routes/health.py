@@ -0,0 +1,25 @@
+"""
+Liveness and readiness probes for the load balancer
+"""
+
+from fastapi import APIRouter, Response, status
+
+from src.lifecycle import readiness
+
+router = APIRouter()
+
+
+@router.get("/healthz", response_model=dict)
+async def liveness():
+    """The worker is alive: its event loop answers"""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", response_model=dict)
+async def ready(response: Response):
+    """The worker is warm and its database, cache and task workers answer"""
+    result = await readiness()
+    if not result["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    response.headers["Cache-Control"] = "no-store"
+    return result
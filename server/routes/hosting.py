@@ -6,10 +6,16 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 
-from routes.auth import get_current_user, get_current_admin_user
-from src.models import User, HostingPlan, Subscription
+from routes.auth import get_current_user, get_current_admin_user, conditional_get
+from src.models import User, HostingPlan, Subscription, Website
 from src.database import get_db
+from src.schemas import PlanEnvelope, PlanListEnvelope
+from src import versions
+from src.response_cache import cached, invalidate
+from src.projection import parse_include
 
 router = APIRouter()
 
@@ -40,7 +46,8 @@ class UpdatePlanRequest(BaseModel):
     is_active: Optional[bool] = None
 
 
-@router.get("/plans", response_model=dict)
+@router.get("/plans", response_model=PlanListEnvelope)
+@cached("plans", PlanListEnvelope, tags=("plans",))
 async def get_hosting_plans():
     """Get all active hosting plans"""
     with get_db() as db:
@@ -48,11 +55,12 @@ async def get_hosting_plans():
 
         return {
             "success": True,
-            "plans": [plan.to_dict() for plan in plans]
+            "plans": plans
         }
 
 
-@router.get("/plans/{plan_id}", response_model=dict)
+@router.get("/plans/{plan_id}", response_model=PlanEnvelope)
+@cached("plan:{plan_id}", PlanEnvelope, tags=("plans",))
 async def get_hosting_plan(plan_id: int):
     """Get a specific hosting plan"""
     with get_db() as db:
@@ -66,7 +74,7 @@ async def get_hosting_plan(plan_id: int):
 
         return {
             "success": True,
-            "plan": plan.to_dict()
+            "plan": plan
         }
 
 
@@ -99,6 +107,8 @@ async def create_hosting_plan(
         db.add(plan)
         db.commit()
         db.refresh(plan)
+        versions.bump(current_user.id, "plans")
+        invalidate("plans")
 
         return {
             "success": True,
@@ -145,6 +155,8 @@ async def update_hosting_plan(
 
         db.commit()
         db.refresh(plan)
+        versions.bump(current_user.id, "plans")
+        invalidate("plans")
 
         return {
             "success": True,
@@ -154,13 +166,22 @@ async def update_hosting_plan(
 
 
 @router.get("/subscription", response_model=dict)
-async def get_my_subscription(current_user: User = Depends(get_current_user)):
-    """Get current user's subscription"""
+async def get_my_subscription(
+    include: Optional[str] = None,
+    _: None = Depends(conditional_get("subscription", "websites", "plans")),
+    current_user: User = Depends(get_current_user)
+):
+    """Get current user's subscription, with its plan when include=plan"""
+    includes = parse_include(include, ("plan",))
+
     with get_db() as db:
-        subscription = db.query(Subscription).filter(
+        query = db.query(Subscription).filter(
             Subscription.user_id == current_user.id,
             Subscription.status == "active"
-        ).first()
+        )
+        if "plan" in includes:
+            query = query.options(joinedload(Subscription.plan))
+        subscription = query.first()
 
         if not subscription:
             return {
@@ -169,23 +190,30 @@ async def get_my_subscription(current_user: User = Depends(get_current_user)):
                 "message": "No active subscription"
             }
 
-        # Get usage statistics
-        from src.models import Website
-        websites = db.query(Website).filter(Website.user_id == current_user.id).all()
+        # Get usage statistics, aggregated in the database
+        total_websites, total_disk_usage = db.query(
+            func.count(Website.id),
+            func.coalesce(func.sum(Website.disk_usage), 0)
+        ).filter(Website.user_id == current_user.id).one()
 
-        total_disk_usage = sum(w.disk_usage for w in websites)
-        total_websites = len(websites)
+        # Only the limits are needed when the plan is not embedded
+        if "plan" in includes:
+            limits = subscription.plan
+        else:
+            limits = db.query(HostingPlan.max_websites, HostingPlan.storage_gb).filter(
+                HostingPlan.id == subscription.plan_id
+            ).one()
 
         usage = {
             "websites_used": total_websites,
-            "websites_limit": subscription.plan.max_websites,
-            "storage_used_mb": total_disk_usage,
-            "storage_limit_gb": subscription.plan.storage_gb,
+            "websites_limit": limits.max_websites,
+            "storage_used_mb": int(total_disk_usage),
+            "storage_limit_gb": limits.storage_gb,
         }
 
         return {
             "success": True,
-            "subscription": subscription.to_dict(),
+            "subscription": subscription.to_dict(include_plan="plan" in includes),
             "usage": usage
         }
 
@@ -233,6 +261,7 @@ async def subscribe_to_plan(
         db.add(subscription)
         db.commit()
         db.refresh(subscription)
+        versions.bump(current_user.id, "subscription")
 
         return {
             "success": True,
@@ -282,6 +311,7 @@ async def upgrade_subscription(
         current_sub.plan_id = plan_id
         db.commit()
         db.refresh(current_sub)
+        versions.bump(current_user.id, "subscription")
 
         return {
             "success": True,
@@ -307,6 +337,7 @@ async def cancel_subscription(current_user: User = Depends(get_current_user)):
 
         subscription.cancel_at_period_end = True
         db.commit()
+        versions.bump(current_user.id, "subscription")
 
         return {
             "success": True,
@@ -332,6 +363,7 @@ async def reactivate_subscription(current_user: User = Depends(get_current_user)
 
         subscription.cancel_at_period_end = False
         db.commit()
+        versions.bump(current_user.id, "subscription")
 
         return {
             "success": True,
@@ -0,0 +1,28 @@
+"""
+Prometheus scrape endpoint
+"""
+
+import asyncio
+import os
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import Response
+
+from src import metrics
+
+router = APIRouter()
+
+# Optional shared secret, sent by Prometheus as a bearer token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@router.get("/metrics", response_class=Response)
+async def scrape(authorization: str = Header(None)):
+    """Metrics of all the workers, in the Prometheus text format"""
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+
+    # Reads one file per worker in multiprocess mode
+    body, content_type = await asyncio.to_thread(metrics.render)
+    return Response(body, media_type=content_type)
@@ -0,0 +1,76 @@
+"""
+Delta-sync route: what changed since a version
+"""
+
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from routes.auth import get_current_user
+from src.models import User, Website, Backup, Task, Domain, Subscription
+from src.database import get_db
+from src.schemas import SyncEnvelope, WebsiteOut, BackupOut, TaskOut, DomainOut, SubscriptionOut
+from src import journal
+
+router = APIRouter()
+
+SYNC_PAGE_SIZE = 1000
+
+# entity -> (model, key in the payload, schema)
+ENTITIES = {
+    "website": (Website, "websites", WebsiteOut),
+    "backup": (Backup, "backups", BackupOut),
+    "task": (Task, "tasks", TaskOut),
+    "domain": (Domain, "domains", DomainOut),
+    "subscription": (Subscription, "subscriptions", SubscriptionOut),
+}
+
+
+@router.get("", response_model=SyncEnvelope)
+async def sync(
+    since: int = 0,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upserted rows and deleted ids since a version
+
+    Store the returned version and pass it back as since. When reset is
+    true, reload the full lists first. When has_more is true, call again
+    right away.
+    """
+    if since < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="since must be a positive version"
+        )
+
+    with get_db() as db:
+        changes = journal.changes_since(db, current_user.id, since, SYNC_PAGE_SIZE)
+        if changes["reset"]:
+            return {"success": True, "version": changes["version"], "reset": True}
+
+        upserted = defaultdict(list)
+        deletes = defaultdict(list)
+        for (entity, entity_id), op in changes["ops"].items():
+            if op == journal.DELETE:
+                deletes[ENTITIES[entity][1]].append(entity_id)
+            else:
+                upserted[entity].append(entity_id)
+
+        upserts = {}
+        for entity, ids in upserted.items():
+            model, key, schema = ENTITIES[entity]
+            rows = db.query(model).filter(model.id.in_(ids)).all()
+            # Gone since: a later delete entry, possibly not visible yet
+            found = {row.id for row in rows}
+            deletes[key].extend(entity_id for entity_id in ids if entity_id not in found)
+            # Validated while the session is open, relationships (subscription plans) load lazily
+            upserts[key] = [schema.model_validate(row) for row in rows]
+
+        return {
+            "success": True,
+            "version": changes["version"],
+            "has_more": changes["has_more"],
+            "upserts": upserts,
+            "deletes": deletes
+        }
@@ -2,46 +2,39 @@
 Task and SSE routes for real-time progress updates
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional
 import asyncio
-import json
 
-from routes.auth import get_current_user
+from routes.auth import get_current_user, conditional_get
 from src.models import User, Task, TaskStatus
 from src.database import get_db
-from src.task_queue import task_queue
+from src.task_queue import task_queue, STREAM_END, end_stream
+from src.schemas import TaskOut, TaskEnvelope, TaskListEnvelope
+from src.serialization import sse_message
+from src import versions
+from src.utils import cache
+from src.tiered_cache import TieredCache
+from src.projection import parse_fields, project, sparse_response
 
 router = APIRouter()
 
+# Snapshots of active tasks sent on SSE (re)connection, shared by reconnect storms
+active_task_snapshots = TieredCache(cache, name="sse_snapshots", l1_ttl=2.0)
 
-class TaskResponse(BaseModel):
-    """Task response model"""
-    id: int
-    task_type: str
-    status: str
-    title: str
-    description: Optional[str]
-    progress: int
-    current_step: Optional[str]
-    total_steps: int
-    error_message: Optional[str]
-    created_at: str
-    started_at: Optional[str]
-    completed_at: Optional[str]
 
-    class Config:
-        from_attributes = True
-
-
-@router.get("/tasks", response_model=dict)
+@router.get("/tasks", response_model=TaskListEnvelope)
 async def get_tasks(
+    response: Response,
     status_filter: Optional[str] = None,
+    fields: Optional[str] = None,
+    _: None = Depends(conditional_get("tasks")),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all tasks for the current user"""
+    """Get all tasks for the current user, optionally only some fields"""
+    columns = parse_fields(fields, Task, TaskOut)
+
     with get_db() as db:
         query = db.query(Task).filter(Task.user_id == current_user.id)
 
@@ -55,15 +48,19 @@ async def get_tasks(
                     detail=f"Invalid status: {status_filter}"
                 )
 
-        tasks = query.order_by(Task.created_at.desc()).limit(50).all()
+        query = query.order_by(Task.created_at.desc()).limit(50)
+        if columns:
+            return sparse_response(response, tasks=project(query, Task, columns))
+
+        tasks = query.all()
 
         return {
             "success": True,
-            "tasks": [task.to_dict() for task in tasks]
+            "tasks": tasks
         }
 
 
-@router.get("/tasks/{task_id}", response_model=dict)
+@router.get("/tasks/{task_id}", response_model=TaskEnvelope)
 async def get_task(
     task_id: int,
     current_user: User = Depends(get_current_user)
@@ -83,7 +80,7 @@ async def get_task(
 
         return {
             "success": True,
-            "task": task.to_dict()
+            "task": task
         }
 
 
@@ -113,6 +110,7 @@ async def cancel_task(
 
         task.status = TaskStatus.CANCELLED
         db.commit()
+        versions.bump(current_user.id, "tasks")
 
         return {
             "success": True,
@@ -140,28 +138,42 @@ async def task_events_stream(current_user: User = Depends(get_current_user)):
         """Generate SSE events for task updates"""
         queue = asyncio.Queue()
 
+        if not task_queue.accepting:
+            # Draining: send the client straight to another worker
+            end_stream(queue)
+
         # Register this client to receive task updates
         task_queue.add_sse_client(current_user.id, queue)
 
         try:
             # Send initial connection message
-            yield f"data: {json.dumps({'connected': True, 'user_id': current_user.id})}\n\n"
+            yield sse_message({'connected': True, 'user_id': current_user.id})
 
             # Send existing pending/running tasks
-            with get_db() as db:
-                active_tasks = db.query(Task).filter(
-                    Task.user_id == current_user.id,
-                    Task.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING])
-                ).all()
-
-                for task in active_tasks:
-                    yield f"data: {json.dumps(task.to_dict())}\n\n"
+            async def load_active_tasks():
+                with get_db() as db:
+                    active_tasks = db.query(Task).filter(
+                        Task.user_id == current_user.id,
+                        Task.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING])
+                    ).all()
+
+                    return [sse_message(TaskOut.model_validate(task)) for task in active_tasks]
+
+            # Keyed by the tasks version, so any task change yields a new snapshot
+            tasks_version = versions.current(current_user.id, ["tasks"])["tasks"]
+            snapshot = await active_task_snapshots.get_or_compute(
+                f"sse:active-tasks:{current_user.id}:{tasks_version}", load_active_tasks, ttl=30
+            )
+            for message in snapshot:
+                yield message
 
             # Stream updates as they come
             while True:
                 try:
                     # Wait for new updates with a timeout
                     message = await asyncio.wait_for(queue.get(), timeout=30.0)
+                    if message is STREAM_END:
+                        break
                     yield message
                 except asyncio.TimeoutError:
                     # Send keepalive ping every 30 seconds
@@ -2,15 +2,19 @@
 Website management routes
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from pydantic import BaseModel, validator
 from typing import Optional, List
 import re
 
-from routes.auth import get_current_user, get_current_admin_user
+from routes.auth import get_current_user, get_current_admin_user, conditional_get
 from src.models import User, Website, WebsiteStatus, TaskType
 from src.database import get_db
+from src.schemas import WebsiteOut, WebsiteEnvelope, WebsiteListEnvelope, WebsiteStatsEnvelope
 from src.task_queue import task_queue
+from src import versions
+from src.response_cache import cached, invalidate
+from src.projection import parse_fields, project, sparse_response
 
 router = APIRouter()
 
@@ -37,12 +41,17 @@ class UpdateWebsiteRequest(BaseModel):
     backup_frequency: Optional[str] = None
 
 
-@router.get("", response_model=dict)
+@router.get("", response_model=WebsiteListEnvelope)
 async def get_websites(
+    response: Response,
     status_filter: Optional[str] = None,
+    fields: Optional[str] = None,
+    _: None = Depends(conditional_get("websites")),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all websites for the current user"""
+    """Get all websites for the current user, optionally only some fields"""
+    columns = parse_fields(fields, Website, WebsiteOut)
+
     with get_db() as db:
         query = db.query(Website).filter(Website.user_id == current_user.id)
 
@@ -56,15 +65,23 @@ async def get_websites(
                     detail=f"Invalid status: {status_filter}"
                 )
 
-        websites = query.order_by(Website.created_at.desc()).all()
+        query = query.order_by(Website.created_at.desc())
+        if columns:
+            return sparse_response(response, websites=project(query, Website, columns))
+
+        websites = query.all()
 
         return {
             "success": True,
-            "websites": [website.to_dict() for website in websites]
+            "websites": websites
         }
 
 
-@router.get("/{website_id}", response_model=dict)
+@router.get("/{website_id}", response_model=WebsiteEnvelope)
+@cached(
+    "website:{website_id}:{current_user.id}", WebsiteEnvelope,
+    tags=("website:{website_id}", "user:{current_user.id}")
+)
 async def get_website(
     website_id: int,
     current_user: User = Depends(get_current_user)
@@ -84,7 +101,7 @@ async def get_website(
 
         return {
             "success": True,
-            "website": website.to_dict()
+            "website": website
         }
 
 
@@ -115,6 +132,8 @@ async def create_website(
         db.refresh(website)
         website_id = website.id
 
+    versions.bump(current_user.id, "websites")
+
     # Queue background task for website creation
     task = await task_queue.enqueue_task(
         user_id=current_user.id,
@@ -165,6 +184,8 @@ async def update_website(
 
         db.commit()
         db.refresh(website)
+        versions.bump(current_user.id, "websites")
+        invalidate(f"website:{website_id}")
 
         return {
             "success": True,
@@ -195,6 +216,9 @@ async def delete_website(
         website.status = WebsiteStatus.DELETING
         db.commit()
 
+    versions.bump(current_user.id, "websites")
+    invalidate(f"website:{website_id}")
+
     # Queue background task for website deletion
     task = await task_queue.enqueue_task(
         user_id=current_user.id,
@@ -231,6 +255,8 @@ async def suspend_website(
         from datetime import datetime
         website.suspended_at = datetime.utcnow()
         db.commit()
+        versions.bump(website.user_id, "websites")
+        invalidate(f"website:{website_id}")
 
         return {
             "success": True,
@@ -256,6 +282,8 @@ async def activate_website(
         website.status = WebsiteStatus.ACTIVE
         website.suspended_at = None
         db.commit()
+        versions.bump(website.user_id, "websites")
+        invalidate(f"website:{website_id}")
 
         return {
             "success": True,
@@ -263,7 +291,11 @@ async def activate_website(
         }
 
 
-@router.get("/{website_id}/stats", response_model=dict)
+@router.get("/{website_id}/stats", response_model=WebsiteStatsEnvelope)
+@cached(
+    "website-stats:{website_id}:{current_user.id}", WebsiteStatsEnvelope,
+    tags=("website:{website_id}", "user:{current_user.id}")
+)
 async def get_website_stats(
     website_id: int,
     current_user: User = Depends(get_current_user)
@@ -287,7 +319,7 @@ async def get_website_stats(
             "disk_quota": website.disk_quota,
             "disk_usage_percentage": (website.disk_usage / website.disk_quota * 100) if website.disk_quota else 0,
             "backup_count": len(website.backups),
-            "last_backup": website.last_backup_at.isoformat() if website.last_backup_at else None,
+            "last_backup": website.last_backup_at,
         }
 
         return {
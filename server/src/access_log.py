@@ -0,0 +1,118 @@
+"""
+Streaming-safe access logging with a non-blocking JSON lines sink
+"""
+
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+class JsonLineSink:
+    """Writes dict records as JSON lines from a background thread"""
+
+    def __init__(self, path: str = None, maxsize: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict):
+        """Queue a record, never blocks the event loop (drops when full)"""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            # Started lazily so that forked workers get their own writer thread
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="access-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stream = open(self.path, "a", buffering=1) if self.path else sys.stdout
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            lines = [json.dumps(record, default=str)]
+            # Drain whatever else is waiting to write it in one go
+            try:
+                while len(lines) < 1000:
+                    record = self._queue.get_nowait()
+                    if record is None:
+                        self._queue.put(None)
+                        break
+                    lines.append(json.dumps(record, default=str))
+            except queue.Empty:
+                pass
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        if self.path:
+            stream.close()
+
+    def close(self, timeout: float = 2.0):
+        """Flush pending records and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class AccessLogMiddleware:
+    """
+    Pure ASGI access logger: records method, path, status, bytes and
+    duration without buffering the response body. Server errors are always
+    logged, other requests according to sample_rate.
+    """
+
+    def __init__(self, app, sink: JsonLineSink = None, sample_rate: float = 1.0):
+        self.app = app
+        self.sink = sink or access_log_sink
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if status_code >= 500 or self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+                client = scope.get("client")
+                self.sink.emit({
+                    "ts": datetime.utcnow().isoformat(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1") or None,
+                    "status": status_code,
+                    "bytes": response_bytes,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "client": client[0] if client else None,
+                })
+
+
+# Global sink instance
+access_log_sink = JsonLineSink(os.getenv("ACCESS_LOG_FILE"))
@@ -0,0 +1,145 @@
+"""
+Subscription billing-period rollover job
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+from sqlalchemy import update, func, select, text, exists
+
+from src.database import get_db
+from src.models import Subscription, Website, WebsiteStatus
+from src.utils import cache
+from src import rollups, versions, journal
+from src.response_cache import invalidate
+
+BILLING_PERIOD_DAYS = 30
+ROLLOVER_INTERVAL = 300  # seconds between two runs
+ROLLOVER_BATCH_SIZE = 1000
+ROLLOVER_LEASE_KEY = "billing:rollover:lease"
+
+
+def _rollover_batch(db, now: datetime, batch_size: int) -> dict:
+    """Roll over one batch of due subscriptions with set-based statements"""
+    # Range scan on (status, current_period_end)
+    due = db.execute(
+        select(Subscription.id, Subscription.user_id)
+        .where(Subscription.status == "active", Subscription.current_period_end <= now)
+        .order_by(Subscription.current_period_end)
+        .limit(batch_size)
+    ).all()
+
+    if not due:
+        return None
+    ids = [subscription_id for subscription_id, _ in due]
+
+    # Keep the fleet rollups in sync, bulk UPDATEs bypass the ORM hooks
+    ending = db.execute(
+        select(Subscription.plan_id, func.count())
+        .where(Subscription.id.in_(ids), Subscription.cancel_at_period_end == True)
+        .group_by(Subscription.plan_id)
+    ).all()
+
+    # Finalize cancellations
+    cancelled = db.execute(
+        update(Subscription)
+        .where(Subscription.id.in_(ids), Subscription.cancel_at_period_end == True)
+        .values(status="cancelled", cancelled_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # Advance the periods of everything else
+    renewed = db.execute(
+        update(Subscription)
+        .where(Subscription.id.in_(ids), Subscription.status == "active")
+        .values(
+            current_period_start=Subscription.current_period_end,
+            current_period_end=func.timestampadd(
+                text("DAY"), BILLING_PERIOD_DAYS, Subscription.current_period_end
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # Suspend the websites of accounts left without an active subscription
+    lapsed_users = select(Subscription.user_id).where(
+        Subscription.id.in_(ids), Subscription.status == "cancelled"
+    )
+    still_subscribed = exists().where(
+        Subscription.user_id == Website.user_id, Subscription.status == "active"
+    )
+    suspending = db.execute(
+        select(Website.id, Website.user_id).where(
+            Website.user_id.in_(lapsed_users),
+            Website.status == WebsiteStatus.ACTIVE,
+            ~still_subscribed,
+        )
+    ).all()
+    suspended = 0
+    if suspending:
+        suspended = db.execute(
+            update(Website)
+            .where(Website.id.in_([website_id for website_id, _ in suspending]))
+            .values(status=WebsiteStatus.SUSPENDED, suspended_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    deltas = {("subscriptions.plan", str(plan_id)): -count for plan_id, count in ending}
+    if suspended:
+        deltas[("websites.status", WebsiteStatus.ACTIVE.name)] = -suspended
+        deltas[("websites.status", WebsiteStatus.SUSPENDED.name)] = suspended
+    rollups.apply_deltas(db.connection(), deltas)
+    journal.record(db.connection(), [
+        *journal.entries_for("subscription", journal.UPSERT, due),
+        *journal.entries_for("website", journal.UPSERT, suspending),
+    ])
+
+    db.commit()
+
+    for user_id in {user_id for _, user_id in due}:
+        versions.bump(user_id, "subscription", "websites")
+        invalidate(f"user:{user_id}")
+
+    return {
+        "renewed": renewed,
+        "cancelled": cancelled,
+        "websites_suspended": suspended,
+    }
+
+
+def rollover_subscriptions(now: datetime = None, batch_size: int = ROLLOVER_BATCH_SIZE) -> dict:
+    """
+    Advance due billing periods, finalize cancellations and suspend the
+    websites of lapsed accounts. Subscriptions several periods behind are
+    picked up again by the next batch until they are current.
+    """
+    now = now or datetime.utcnow()
+    totals = {"renewed": 0, "cancelled": 0, "websites_suspended": 0}
+
+    with get_db() as db:
+        while True:
+            result = _rollover_batch(db, now, batch_size)
+            if result is None:
+                break
+            for key, value in result.items():
+                totals[key] += value
+
+    return totals
+
+
+async def run_billing_scheduler(interval: int = ROLLOVER_INTERVAL):
+    """Run the rollover periodically, on a single worker at a time"""
+    while True:
+        # The lease makes sure only one of the uvicorn workers runs each round
+        if cache.add(ROLLOVER_LEASE_KEY, os.getpid(), expire=interval - 1):
+            try:
+                totals = await asyncio.to_thread(rollover_subscriptions)
+                if any(totals.values()):
+                    print(f"🧾 Billing rollover: {totals['renewed']} renewed, "
+                          f"{totals['cancelled']} cancelled, "
+                          f"{totals['websites_suspended']} websites suspended")
+            except Exception as e:
+                print(f"❌ Billing rollover failed: {e}")
+
+        await asyncio.sleep(interval)
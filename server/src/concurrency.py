@@ -0,0 +1,215 @@
+"""
+Adaptive concurrency limiting and load shedding per route group
+"""
+
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from typing import Dict, Optional
+
+import orjson
+
+# Never limited: cheap and needed to judge the health of the worker
+BYPASS_PATHS = {"/", "/healthz", "/readyz", "/metrics"}
+
+STREAMING_SUFFIXES = ("/stream/events",)
+STREAMING_PREFIXES = ("/admin/export/",)
+AUTH_PREFIX = "/auth/"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit driven by the observed latency
+
+    While requests answer under target_latency and the limit is actually
+    used, it grows by about one per limit completions. A slower answer
+    shrinks it by backoff, at most once per target_latency so that one
+    burst of slow requests does not collapse it. Requests over the limit
+    wait up to queue_timeout in a bounded FIFO queue, then are shed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        max_limit: int,
+        min_limit: int = 1,
+        target_latency: float = 0.5,
+        backoff: float = 0.9,
+        max_queue: int = 50,
+        queue_timeout: float = 0.5,
+        adaptive: bool = True
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.inflight = 0
+        self.metrics = Counter()
+        self._waiters: deque = deque()
+        self._last_decrease = 0.0
+
+    async def acquire(self) -> bool:
+        """Take a slot, False when the request must be shed"""
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            self.metrics["admitted"] += 1
+            return True
+
+        if len(self._waiters) >= self.max_queue:
+            self.metrics["shed"] += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.metrics["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted right as the wait timed out, the slot is ours
+                self.metrics["admitted"] += 1
+                return True
+            waiter.cancel()
+            self.metrics["shed"] += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.metrics["admitted"] += 1
+        return True
+
+    def release(self, latency: Optional[float]):
+        """Free a slot, latency (seconds) is None when it should not be sampled"""
+        self.inflight -= 1
+        if self.adaptive and latency is not None:
+            self._update(latency)
+        self._wake()
+
+    def _update(self, latency: float):
+        now = time.monotonic()
+        if latency > self.target_latency:
+            if now - self._last_decrease >= self.target_latency:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.metrics["decreases"] += 1
+        elif self.inflight + 1 >= self.limit / 2:
+            # Only grow a limit that is in use, an idle one proves nothing
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _wake(self):
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait, grows with the backlog"""
+        return max(1, math.ceil(len(self._waiters) * self.target_latency / max(self.limit, 1)))
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "queued_now": len(self._waiters),
+            "adaptive": self.adaptive,
+            **{metric: self.metrics[metric] for metric in ("admitted", "queued", "shed", "decreases")},
+        }
+
+
+limiters: Dict[str, AdaptiveLimiter] = {
+    # Password hashing is CPU bound, keep logins from starving the worker
+    "auth": AdaptiveLimiter("auth", initial_limit=8, max_limit=32, target_latency=0.5),
+    "reads": AdaptiveLimiter("reads", initial_limit=32, max_limit=256, target_latency=0.25),
+    "writes": AdaptiveLimiter("writes", initial_limit=16, max_limit=64, target_latency=1.0),
+    # SSE connections and exports last minutes, so latency says nothing: a
+    # fixed cap on their own pool, which keeps them from queuing behind reads
+    "streaming": AdaptiveLimiter("streaming", initial_limit=500, max_limit=500, max_queue=0, adaptive=False),
+}
+
+
+def route_group(scope) -> Optional[str]:
+    """Limiter group of a request, None when it bypasses limiting"""
+    path = scope["path"]
+    method = scope["method"]
+    if path in BYPASS_PATHS or method == "OPTIONS":
+        return None
+    if path.endswith(STREAMING_SUFFIXES) or path.startswith(STREAMING_PREFIXES):
+        return "streaming"
+    if path.startswith(AUTH_PREFIX) and method == "POST":
+        return "auth"
+    if method in WRITE_METHODS:
+        return "writes"
+    return "reads"
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Pure ASGI middleware applying the per-group limiters
+
+    Latency is sampled up to the response start, so slow clients reading a
+    large body do not shrink the limit.
+    """
+
+    def __init__(self, app, limiters: Dict[str, AdaptiveLimiter] = limiters):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        group = route_group(scope)
+        limiter = self.limiters.get(group)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            await self._shed(send, limiter)
+            return
+
+        start = time.perf_counter()
+        latency = None
+
+        async def timed_send(message):
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            limiter.release(latency)
+
+    async def _shed(self, send, limiter: AdaptiveLimiter):
+        body = orjson.dumps({"detail": "Server is overloaded, retry later"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(limiter.retry_after()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
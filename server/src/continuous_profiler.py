@@ -0,0 +1,206 @@
+"""
+Continuous, low-overhead sampling profiler (opt-in with PROFILER_HZ)
+
+Each worker runs a thread that samples the stacks of its busy threads
+PROFILER_HZ times per second: the event loop (requests and task handlers)
+and the threadpool. The loop thread is skipped while no task runs on it,
+waiting threads (idle pool threads, log writers) by their innermost
+frame, so the flamegraphs show where CPU goes rather than where threads
+sleep.
+
+Stacks are counted in memory and merged every BUCKET_SECONDS into a
+bucket of the shared cache, kept for RETENTION, so GET /admin/profiler/
+flamegraph can merge any time range of the whole fleet.
+
+The thread measures its own CPU time: when it goes over MAX_OVERHEAD of a
+core over a bucket the sampling rate is halved, and restored when well
+under it. Weights are stored in milliseconds so buckets sampled at
+different rates still merge correctly.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from src.profiling import Stack, stack_of
+from src.utils import cache
+
+PROFILER_HZ = float(os.getenv("PROFILER_HZ", "0"))  # 0 disables the profiler
+BUCKET_SECONDS = 60
+RETENTION = 86400  # seconds buckets are kept
+MAX_OVERHEAD = 0.01  # of one core, for the sampling thread
+MAX_INTERVAL = 1.0  # seconds, lowest rate the overhead guard goes to
+BUCKET_KEY = "cpu_profile:{}"
+
+# Innermost frames of threads that are waiting, not running
+IDLE_FRAMES = {
+    ("selectors.py", "select"),  # asyncio loops other than the worker's
+    ("threading.py", "wait"),  # idle pool threads, queue consumers
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # idle executor threads, asyncio.to_thread
+}
+OWN_THREADS = ("continuous-profiler", "loop-watchdog")
+
+enabled = PROFILER_HZ > 0
+
+
+def _idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def _bucket(timestamp: float) -> int:
+    return int(timestamp // BUCKET_SECONDS * BUCKET_SECONDS)
+
+
+class ContinuousProfiler:
+    def __init__(self, hz: float = PROFILER_HZ):
+        self.base_interval = 1 / hz if hz > 0 else 0.01
+        self.interval = self.base_interval
+        self.overhead = 0.0  # sampling thread CPU / wall time, last bucket
+        self._stacks: Counter = Counter()  # stack -> milliseconds
+        self._samples = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._loop = None
+        self._loop_thread = None
+        self._names: Dict[int, str] = {}
+
+    def start(self):
+        """Start sampling, from the worker's event loop thread"""
+        if self._thread is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="continuous-profiler", daemon=True)
+            self._thread.start()
+            print(f"📈 Continuous profiler sampling worker {os.getpid()} at {1 / self.interval:.0f} Hz")
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _thread_name(self, thread_id: int) -> str:
+        name = self._names.get(thread_id)
+        if name is None:
+            self._names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._names.get(thread_id, "thread")
+        return name
+
+    def _sample(self, weight: int):
+        for thread_id, frame in sys._current_frames().items():
+            if _idle(frame):
+                continue
+            if thread_id == self._loop_thread:
+                # Idle whatever the loop implementation: uvloop polls in C,
+                # under the frame that started the loop
+                if asyncio.current_task(self._loop) is None:
+                    continue
+                root = "event loop"
+            else:
+                root = self._thread_name(thread_id)
+                if root.startswith(OWN_THREADS):
+                    continue
+            self._stacks[(root,) + stack_of(frame)] += weight
+            self._samples += 1
+
+    def _run(self):
+        bucket = _bucket(time.time())
+        wall_start, cpu_start = time.monotonic(), time.thread_time()
+        while not self._stop.wait(self.interval):
+            self._sample(round(self.interval * 1000))
+            if time.time() >= bucket + BUCKET_SECONDS:
+                wall, cpu = time.monotonic() - wall_start, time.thread_time() - cpu_start
+                self._flush(bucket, wall, cpu)
+                self._adjust(cpu / wall)
+                bucket = _bucket(time.time())
+                wall_start, cpu_start = time.monotonic(), time.thread_time()
+        self._flush(bucket, time.monotonic() - wall_start, time.thread_time() - cpu_start)
+
+    def _adjust(self, overhead: float):
+        self.overhead = overhead
+        if overhead > MAX_OVERHEAD and self.interval < MAX_INTERVAL:
+            self.interval = min(self.interval * 2, MAX_INTERVAL)
+            print(f"📈 Profiler overhead {overhead:.2%}, sampling at {1 / self.interval:.0f} Hz")
+        elif overhead < MAX_OVERHEAD / 4 and self.interval > self.base_interval:
+            self.interval = max(self.interval / 2, self.base_interval)
+
+    def _flush(self, bucket: int, wall: float, cpu: float):
+        stacks, self._stacks = self._stacks, Counter()
+        samples, self._samples = self._samples, 0
+        try:
+            merge_bucket(bucket, stacks, samples, wall, cpu)
+        except Exception as e:
+            print(f"❌ Could not store the profile bucket: {e}")
+
+
+def merge_bucket(bucket: int, stacks: Dict[Stack, int], samples: int, wall: float, cpu: float):
+    """
+    Add a worker's stacks to a bucket of the shared cache. Stacks are
+    stored as indexes into a frame table, labels repeat a lot.
+    """
+    key = BUCKET_KEY.format(bucket)
+    with cache.transact():
+        stored = cache.get(key) or {"frames": [], "stacks": {}, "samples": 0, "wall": 0.0, "cpu": 0.0}
+        index = {label: position for position, label in enumerate(stored["frames"])}
+        for stack, weight in stacks.items():
+            encoded = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(stored["frames"])
+                    stored["frames"].append(label)
+                encoded.append(index[label])
+            encoded = tuple(encoded)
+            stored["stacks"][encoded] = stored["stacks"].get(encoded, 0) + weight
+        stored["samples"] += samples
+        stored["wall"] += wall
+        stored["cpu"] += cpu
+        cache.set(key, stored, expire=RETENTION + BUCKET_SECONDS)
+
+
+def _timestamp(moment: datetime) -> float:
+    # Naive datetimes are UTC, like the rest of the API
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def merged(start: datetime, end: datetime) -> Tuple[Dict[Stack, int], dict]:
+    """Stacks (milliseconds) of every worker between start and end, with totals"""
+    stacks: Counter = Counter()
+    totals = {"buckets": 0, "samples": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+    for bucket in range(_bucket(_timestamp(start)), int(_timestamp(end)) + 1, BUCKET_SECONDS):
+        stored = cache.get(BUCKET_KEY.format(bucket))
+        if not stored:
+            continue
+        frames = stored["frames"]
+        for encoded, weight in stored["stacks"].items():
+            stacks[tuple(frames[position] for position in encoded)] += weight
+        totals["buckets"] += 1
+        totals["samples"] += stored["samples"]
+        totals["wall_seconds"] += stored["wall"]
+        totals["cpu_seconds"] += stored["cpu"]
+    # Sampling thread CPU per worker and second, averaged over the range
+    totals["overhead"] = round(totals["cpu_seconds"] / totals["wall_seconds"], 5) if totals["wall_seconds"] else None
+    return stacks, totals
+
+
+def status() -> dict:
+    return {
+        "enabled": enabled,
+        "worker": os.getpid(),
+        "hz": round(1 / continuous_profiler.interval, 1) if enabled else 0,
+        "overhead": round(continuous_profiler.overhead, 5),
+        "bucket_seconds": BUCKET_SECONDS,
+        "retention_seconds": RETENTION,
+    }
+
+
+# Global profiler instance, started by the lifespan when enabled
+continuous_profiler = ContinuousProfiler()
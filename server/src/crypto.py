@@ -4,11 +4,11 @@ import secrets
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, Tuple
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv
 
-from src.models import *
-from src.database import *
+from src.models import User, UserRole, UserSession, ActivityLog, ActivityType, ActivityLevel
+from src.database import get_db
+from src.utils import cache
 
 load_dotenv()
 
@@ -17,6 +17,7 @@ SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'qdshjkqsdkjhdfjhsdfhjksjhkuhqhhjk')
 ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = 30  # 30 minutes
 REFRESH_TOKEN_EXPIRE_DAYS = 7  # 7 days
+ACTIVE_FLAG_TTL = 60  # seconds a disabled account may still get 304s from conditional GETs
 
 
 class AuthError(Exception):
@@ -350,11 +351,22 @@ class AuthService:
             if not user:
                 raise AuthError('User not found', 404)
             
+            # Read by conditional GETs, which answer before loading the user
+            cache.add(f"user_active:{user.id}", user.is_active, expire=ACTIVE_FLAG_TTL)
+            
             if not user.is_active:
                 raise AuthError('Account is disabled', 403)
             
             return user
     
+    @staticmethod
+    def cached_is_active(user_id: int) -> Optional[bool]:
+        """
+        is_active as seen by a request of the user at most ACTIVE_FLAG_TTL
+        seconds ago, None when unknown
+        """
+        return cache.get(f"user_active:{user_id}")
+    
     @staticmethod
     def change_password(user_id: int, old_password: str, new_password: str):
         """
@@ -1,8 +1,6 @@
-from sqlalchemy import DateTime, create_engine, Column, Integer, String, Boolean, ForeignKey, select
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.engine import URL
-import pymysql
 from dotenv import load_dotenv
 import os
 from urllib.parse import quote_plus,quote
@@ -26,8 +24,10 @@ db_url = URL.create(
 
 #print(db_url)
 
-engine = create_engine(db_url, connect_args=())
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+# Created by init_engine, from the lifespan or on the first session: importing
+# the models (alembic, the launcher before its fork) does not load the driver
+engine = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
 # autoflush : load changes before queries
 # autocommit : commit changes after queries
 
@@ -41,8 +41,18 @@ Base = declarative_base()
 #    finally:
 #        db.close()
 
+def init_engine():
+    """Create the engine once and bind the sessions to it"""
+    global engine
+    if engine is None:
+        engine = create_engine(db_url, connect_args=())
+        SessionLocal.configure(bind=engine)
+    return engine
+
 @contextmanager
 def get_db():
+    if engine is None:
+        init_engine()
     db = SessionLocal()
     try:
         yield db
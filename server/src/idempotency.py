@@ -0,0 +1,141 @@
+"""
+Idempotency-Key support for mutating requests
+"""
+
+import asyncio
+import hashlib
+import time
+
+import orjson
+
+from src.crypto import AuthService, AuthError
+from src.utils import cache
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+
+
+def _subject(authorization: bytes) -> str:
+    """Scope keys per user, without hitting the database"""
+    if not authorization:
+        return "anonymous"
+    try:
+        token = authorization.decode("latin-1").split(" ", 1)[1]
+        return f"user:{AuthService.verify_token(token, 'access')['user_id']}"
+    except (IndexError, KeyError, AuthError):
+        return "auth:" + hashlib.sha256(authorization).hexdigest()[:16]
+
+
+async def _send_json(send, status: int, content: dict):
+    body = orjson.dumps(content)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    Replays the stored response of a request sent again with the same
+    Idempotency-Key, instead of running it twice.
+
+    The first request claims the key in the shared cache. Concurrent
+    duplicates wait for it to finish, on any worker. Reusing a key with a
+    different method, path or body is rejected with 422. Server errors are
+    not stored, so the client may retry them.
+    """
+
+    def __init__(self, app, ttl: int = 86400, lock_timeout: int = 60, wait_timeout: float = 30.0):
+        self.app = app
+        self.ttl = ttl  # how long responses are replayed
+        self.lock_timeout = lock_timeout  # how long an unfinished claim blocks duplicates
+        self.wait_timeout = wait_timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(b"idempotency-key")
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": "Idempotency-Key is too long"})
+            return
+
+        # The body is part of the fingerprint, so it has to be read upfront
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        fingerprint = hashlib.sha256(b"\0".join([
+            scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body
+        ])).hexdigest()
+        cache_key = f"idempotency:{_subject(headers.get(b'authorization'))}:{key.decode('latin-1')}"
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            if cache.add(cache_key, {"state": "pending", "fingerprint": fingerprint}, expire=self.lock_timeout):
+                await self._run(scope, body, receive, send, cache_key, fingerprint)
+                return
+
+            entry = cache.get(cache_key)
+            if entry is None:
+                continue  # The claim expired or was released, try to take it
+            if entry["fingerprint"] != fingerprint:
+                await _send_json(send, 422, {"detail": "Idempotency-Key was already used for a different request"})
+                return
+            if entry["state"] == "done":
+                await send({
+                    "type": "http.response.start",
+                    "status": entry["status"],
+                    "headers": entry["headers"] + [(b"idempotent-replayed", b"true")],
+                })
+                await send({"type": "http.response.body", "body": entry["body"]})
+                return
+            if time.monotonic() > deadline:
+                await _send_json(send, 409, {"detail": "A request with this Idempotency-Key is still in progress"})
+                return
+            await asyncio.sleep(0.1)
+
+    async def _run(self, scope, body, receive, send, cache_key, fingerprint):
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": 500, "headers": [], "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if response["status"] < 500:
+                cache.set(cache_key, {
+                    "state": "done",
+                    "fingerprint": fingerprint,
+                    "status": response["status"],
+                    "headers": response["headers"],
+                    "body": b"".join(response["body"]),
+                }, expire=self.ttl)
+            else:
+                cache.delete(cache_key)
@@ -0,0 +1,208 @@
+"""
+Per-user change journal backing the delta-sync endpoint
+
+Every flush touching a journaled entity appends (entity, id, op) rows in
+the same transaction, so the journal can never disagree with the data.
+Entry ids are the sync versions.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import event, select, delete, exists, func
+from sqlalchemy.orm import Session, aliased
+
+from src.database import get_db
+from src.models import ChangeJournal, Website, Backup, Task, Domain, Subscription
+from src.utils import cache
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# model -> entity name
+JOURNALED = {
+    Website: "website",
+    Backup: "backup",
+    Task: "task",
+    Domain: "domain",
+    Subscription: "subscription",
+}
+
+# Transactions commit at most this long after their flush, entries younger
+# than that may still have uncommitted predecessors (see sync)
+SETTLE_SECONDS = 30
+RETENTION_DAYS = 30
+COMPACTION_INTERVAL = 3600  # seconds between two runs
+COMPACTION_BATCH_SIZE = 5000
+COMPACTION_LEASE_KEY = "journal:compaction:lease"
+HORIZON_KEY = "journal:horizon"  # highest version removed by trimming
+
+
+def _entries(session: Session) -> List[dict]:
+    entries = []
+    unresolved = []  # backups whose owner must be looked up
+
+    def add(obj, op):
+        entity = JOURNALED.get(type(obj))
+        if entity is None:
+            return
+        entry = {"entity": entity, "entity_id": obj.id, "op": op}
+        if isinstance(obj, Backup):
+            website = obj.__dict__.get("website")
+            if website is None:
+                unresolved.append((entry, obj.website_id))
+                return
+            entry["user_id"] = website.user_id
+        else:
+            entry["user_id"] = obj.user_id
+        entries.append(entry)
+
+    for obj in session.new:
+        add(obj, UPSERT)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            add(obj, UPSERT)
+    for obj in session.deleted:
+        add(obj, DELETE)
+
+    if unresolved:
+        owners = dict(session.connection().execute(
+            select(Website.id, Website.user_id).where(
+                Website.id.in_({website_id for _, website_id in unresolved})
+            )
+        ).all())
+        for entry, website_id in unresolved:
+            # The website may be gone in the same flush, its own delete covers it
+            if website_id in owners:
+                entry["user_id"] = owners[website_id]
+                entries.append(entry)
+
+    return entries
+
+
+def record(connection, entries: Iterable[dict]):
+    """Append entries, for writers that bypass the ORM such as bulk UPDATEs"""
+    entries = list(entries)
+    if entries:
+        connection.execute(ChangeJournal.__table__.insert(), entries)
+
+
+def entries_for(entity: str, op: str, rows: Iterable[Tuple[int, int]]) -> List[dict]:
+    """Build entries from (entity_id, user_id) pairs"""
+    return [
+        {"entity": entity, "entity_id": entity_id, "user_id": user_id, "op": op}
+        for entity_id, user_id in rows
+    ]
+
+
+@event.listens_for(Session, "after_flush")
+def _journal_changes(session: Session, flush_context):
+    record(session.connection(), _entries(session))
+
+
+def horizon(db: Session) -> int:
+    """Versions at or below this may have been trimmed"""
+    value = cache.get(HORIZON_KEY)
+    if value is None:
+        # Lost with the cache: assume everything before the oldest entry went
+        oldest = db.query(func.min(ChangeJournal.id)).scalar()
+        value = oldest - 1 if oldest else 0
+    return value
+
+
+def changes_since(db: Session, user_id: int, since: int, limit: int) -> dict:
+    """
+    Latest op per entity after a version, and the version to resume from
+
+    Entries younger than SETTLE_SECONDS are returned but the version does
+    not move past them: an older transaction may still commit a lower id,
+    and replaying an entry is harmless since upserts read the current row.
+    """
+    if since < horizon(db):
+        return {"reset": True, "version": db.query(func.max(ChangeJournal.id)).scalar() or 0}
+
+    rows = db.query(
+        ChangeJournal.id, ChangeJournal.entity, ChangeJournal.entity_id,
+        ChangeJournal.op, ChangeJournal.created_at
+    ).filter(
+        ChangeJournal.user_id == user_id,
+        ChangeJournal.id > since
+    ).order_by(ChangeJournal.id).limit(limit).all()
+
+    settled_before = db.query(func.now()).scalar() - timedelta(seconds=SETTLE_SECONDS)
+    version = since
+    for row in rows:
+        if row.created_at > settled_before:
+            break
+        version = row.id
+
+    latest = {}
+    for row in rows:
+        latest[(row.entity, row.entity_id)] = row.op
+
+    return {
+        "reset": False,
+        "version": version,
+        "has_more": len(rows) == limit and version == rows[-1].id,
+        "ops": latest,
+    }
+
+
+def compact(now: datetime = None, retention_days: int = RETENTION_DAYS) -> dict:
+    """
+    Drop entries superseded by a later one for the same entity, which no
+    client needs, then trim entries past the retention window. Clients
+    behind the trimmed versions are told to reset.
+    """
+    now = now or datetime.utcnow()
+    later = aliased(ChangeJournal)
+    superseded_count = 0
+    trimmed = 0
+
+    with get_db() as db:
+        while True:
+            superseded = db.execute(
+                select(ChangeJournal.id).where(exists().where(
+                    later.user_id == ChangeJournal.user_id,
+                    later.entity == ChangeJournal.entity,
+                    later.entity_id == ChangeJournal.entity_id,
+                    later.id > ChangeJournal.id,
+                )).limit(COMPACTION_BATCH_SIZE)
+            ).scalars().all()
+            if not superseded:
+                break
+            db.execute(delete(ChangeJournal).where(ChangeJournal.id.in_(superseded)))
+            db.commit()
+            superseded_count += len(superseded)
+
+        # Trim a prefix of versions, so that the horizon is a single number
+        cutoff = db.query(func.min(ChangeJournal.id)).filter(
+            ChangeJournal.created_at >= now - timedelta(days=retention_days)
+        ).scalar()
+        if cutoff is None:
+            # Keep the newest entry, it holds the current version
+            cutoff = db.query(func.max(ChangeJournal.id)).scalar()
+        if cutoff:
+            trimmed = db.execute(delete(ChangeJournal).where(ChangeJournal.id < cutoff)).rowcount
+            db.commit()
+            if trimmed:
+                cache.set(HORIZON_KEY, max(cutoff - 1, cache.get(HORIZON_KEY, default=0)))
+
+    return {"superseded": superseded_count, "trimmed": trimmed}
+
+
+async def run_journal_compactor(interval: int = COMPACTION_INTERVAL):
+    """Compact the journal periodically, on a single worker at a time"""
+    while True:
+        if cache.add(COMPACTION_LEASE_KEY, os.getpid(), expire=interval - 1):
+            try:
+                totals = await asyncio.to_thread(compact)
+                if any(totals.values()):
+                    print(f"🗜️ Journal compaction: {totals['superseded']} superseded, "
+                          f"{totals['trimmed']} trimmed")
+            except Exception as e:
+                print(f"❌ Journal compaction failed: {e}")
+
+        await asyncio.sleep(interval)
@@ -0,0 +1,361 @@
+"""
+Production launcher: preloads the app once, then forks the workers
+
+    python -m src.launcher --workers auto --port 21580
+    python -m src.launcher --debug
+
+The master imports the whole app, freezes the GC and forks, so workers
+share the imported code and data copy-on-write instead of each importing
+everything again. The listening socket is bound once by the master with
+SO_REUSEPORT and inherited by the workers: a recycled worker cannot drop
+connections waiting in a backlog of its own, and a new launcher can bind
+the port next to the old one for a restart without downtime. Workers
+exit after max_requests (plus jitter, so they do not all restart
+together) and are respawned by the master.
+"""
+
+import argparse
+import gc
+import importlib
+import importlib.util
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from math import floor
+
+import uvicorn
+
+import src.Colors as clr
+
+WDIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+MAX_LINE_LENGTH = 65
+
+WORKER_MEMORY_MB = 150  # budget per worker when sizing from the available memory
+MIN_RESPAWN_INTERVAL = 1.0  # seconds, slows down a worker crashing at startup
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hosting panel API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=21580)
+    parser.add_argument("--workers", default="auto", help="number of workers, or auto (CPUs and memory)")
+    parser.add_argument("--debug", action="store_true", help="single reloading worker, CORS wildcard")
+    parser.add_argument("--no-ssl", dest="ssl", action="store_false")
+    parser.add_argument("--ssl-keyfile", default=os.path.join(WDIR, "certs/key.pem"))
+    parser.add_argument("--ssl-certfile", default=os.path.join(WDIR, "certs/cert.pem"))
+    parser.add_argument("--max-requests", type=int, default=10000, help="recycle a worker after this many requests, 0 to disable")
+    parser.add_argument("--max-requests-jitter", type=int, default=1000)
+    parser.add_argument("--drain-deadline", type=float, default=float(os.getenv("DRAIN_DEADLINE", "30")),
+                        help="seconds for running tasks and requests to finish when draining")
+    parser.add_argument("--memory-report", type=float, default=0, metavar="SECONDS",
+                        help="print the memory of every worker this long after startup")
+    return parser.parse_args(argv)
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory_mb() -> int:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def auto_workers() -> int:
+    """One worker per CPU (the workers are async), capped by the memory"""
+    workers = available_cpus()
+    memory = available_memory_mb()
+    if memory is not None:
+        workers = min(workers, memory // WORKER_MEMORY_MB)
+    return max(1, workers)
+
+
+def memory_usage(pid: int) -> dict:
+    """RSS and its shared and private parts in MB, from /proc (Linux)"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0) / 1024,
+        "pss": values.get("Pss", 0) / 1024,
+        "shared": (values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)) / 1024,
+        "private": (values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)) / 1024,
+    }
+
+
+def memory_report(pids) -> str:
+    lines = [f"{'pid':>8} {'rss':>8} {'pss':>8} {'shared':>8} {'private':>8}  (MB)"]
+    total_pss = 0
+    for pid in pids:
+        try:
+            usage = memory_usage(pid)
+        except OSError:
+            continue
+        total_pss += usage["pss"]
+        lines.append(f"{pid:>8} {usage['rss']:>8.1f} {usage['pss']:>8.1f} {usage['shared']:>8.1f} {usage['private']:>8.1f}")
+    lines.append(f"{'total pss':>17} {total_pss:.1f}")
+    return "\n".join(lines)
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _implementations():
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return loop, http
+
+
+def _prepare_fork():
+    """Drop what must not be shared between processes, then freeze the heap"""
+    from src import database
+    from src.utils import cache
+    from src.tiered_cache import TieredCache
+    from src.metrics import mark_process_dead
+
+    # Pooled connections and SQLite handles are not fork-safe, each worker
+    # opens its own on first use
+    if database.engine is not None:
+        database.engine.dispose()
+    cache.close()
+    for tiered in TieredCache.instances:
+        tiered.l2.close()
+
+    # The master created the unlabelled gauges at import, it never updates them
+    mark_process_dead(os.getpid())
+
+    # Objects allocated so far are never collected, so the collector does
+    # not write to their pages and break the copy-on-write sharing
+    gc.collect()
+    gc.freeze()
+
+
+def _prepare_metrics_dir():
+    """
+    Empty directory where the workers share their metrics, one per launcher
+    so that a new launcher started next to the old one does not mix them.
+    prometheus_client reads it when imported, so this runs before the app.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.path.join(
+        tempfile.gettempdir(), f"hosting-panel-metrics-{os.getpid()}"
+    )
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+
+class _DrainingServer(uvicorn.Server):
+    """Starts draining on SIGTERM/SIGINT, before uvicorn waits for connections"""
+
+    def handle_exit(self, sig, frame):
+        from src.lifecycle import worker
+        worker.request_drain()
+        super().handle_exit(sig, frame)
+
+
+def _worker(app, args, sock: socket.socket, loop: str, http: str):
+    random.seed()
+    limit = None
+    if args.max_requests:
+        limit = args.max_requests + random.randint(0, args.max_requests_jitter)
+
+    config = uvicorn.Config(
+        app,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        log_level="warning",
+        access_log=False,
+        limit_max_requests=limit,
+        # SSE streams end when draining, this only bounds stuck requests
+        timeout_graceful_shutdown=args.drain_deadline,
+        ssl_keyfile=args.ssl_keyfile if args.ssl else None,
+        ssl_certfile=args.ssl_certfile if args.ssl else None,
+    )
+    _DrainingServer(config).run(sockets=[sock])
+
+
+def _supervise(app, args, workers: int):
+    loop, http = _implementations()
+    print(f"⚙️ Event loop: {clr.CYAN}{loop}{clr.NONE}, HTTP parser: {clr.CYAN}{http}{clr.NONE}")
+
+    sock = _bind(args.host, args.port)
+    _prepare_fork()
+
+    children = {}  # pid -> start time
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            # Not the master's handlers: uvicorn puts them back after a graceful
+            # shutdown and raises the signal again, stop() would then kill the
+            # fork-time copy of children, pids that may have been reused since
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            # Until the lifespan installs the drain
+            signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+            code = 0
+            try:
+                _worker(app, args, sock, loop, http)
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def drain(signum, frame):
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGUSR2)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    # Drains every worker without stopping them, see src/lifecycle.py
+    signal.signal(signal.SIGUSR2, drain)
+
+    for _ in range(workers):
+        spawn()
+
+    if args.memory_report:
+        report = threading.Timer(args.memory_report, lambda: print(f"\n{memory_report(list(children))}\n"))
+        report.daemon = True
+        report.start()
+
+    from src.metrics import mark_process_dead
+
+    while children:
+        pid, status = os.wait()
+        mark_process_dead(pid)
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        # Recycled after max_requests, or crashed
+        if time.monotonic() - started < MIN_RESPAWN_INTERVAL:
+            time.sleep(MIN_RESPAWN_INTERVAL)
+        spawn()
+
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    print("⛔ All workers stopped")
+
+
+def _print_banner(app_module, args, workers: int):
+    protocol = "https" if args.ssl else "http"
+    print(f"🚀 Starting the SoundPool server on {clr.CYAN}{protocol}://{args.host}:{args.port}{clr.NONE}.\n")
+
+    if args.debug:
+        print(f"⚠️ {clr.YELLOW}Warning{clr.NONE}, DEBUG mode is activated. \n{clr.LIGHT_RED}Do not use this mode for production!{clr.NONE}")
+        pll = MAX_LINE_LENGTH+16
+        print(f"{clr.YELLOW}╔{'═'*pll}{clr.NONE}")
+
+        debug_messages = [
+            f"The number of workers was reduced to {clr.LIGHT_RED}{workers}{clr.NONE}",
+            "The CORS wildcard is activated.",
+            f"Access logs are sampled at {clr.LIGHT_RED}{app_module.access_log_sample_rate:.0%}{clr.NONE}",
+            f"The server will reload on changes in {clr.UNDERLINE}{WDIR}{clr.NONE}"
+        ]
+
+        if args.ssl:
+            debug_messages.append(f"SSL enabled with {clr.LIGHT_RED}self-signed{clr.NONE} certificate")
+
+        for ll in debug_messages:
+            if (len(ll) > MAX_LINE_LENGTH):
+                print(f"{clr.YELLOW}║{clr.NONE} ", end="")
+
+                print(ll[:MAX_LINE_LENGTH])
+                lcl=clr.lastUsed(ll[:MAX_LINE_LENGTH])
+                for i in range(1, floor(len(ll)/(MAX_LINE_LENGTH+1))+1):
+                    print(f"{clr.NONE}{clr.YELLOW}║{clr.NONE} ", end="")
+                    print((" "*5)+lcl+ll[(MAX_LINE_LENGTH*i):(MAX_LINE_LENGTH*(i+1))]+clr.NONE)
+                    lcl=clr.lastUsed(ll[(MAX_LINE_LENGTH*i):(MAX_LINE_LENGTH*(i+1))])
+            else:
+                print(f"{clr.YELLOW}║{clr.NONE} {ll}")
+
+        print(f"{clr.YELLOW}╚{'═'*pll}{clr.NONE}\n")
+    else:
+        if (workers<3):
+            print(f"⚠️ {clr.YELLOW}Warning{clr.NONE}, for a production environment, {workers} workers might not be enough.")
+        else:
+            print(f"⛏️ Running {workers} workers")
+
+    if args.ssl:
+        print("🔒 SSL/HTTPS enabled\n")
+
+    print("")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.debug:
+        # Read by main.py at import time
+        os.environ["DEBUG"] = "1"
+    # Read by src.lifecycle at import time
+    os.environ["DRAIN_DEADLINE"] = str(args.drain_deadline)
+
+    workers = 1 if args.debug else (auto_workers() if args.workers == "auto" else int(args.workers))
+    if not args.debug:
+        _prepare_metrics_dir()
+
+    # Preload: everything below is imported once, before the fork
+    sys.path.insert(0, WDIR)
+    app_module = importlib.import_module("main")
+    _print_banner(app_module, args, workers)
+
+    if args.debug:
+        # The reloader needs an import string and its own worker process
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level="warning",
+            access_log=True,
+            ssl_keyfile=args.ssl_keyfile if args.ssl else None,
+            ssl_certfile=args.ssl_certfile if args.ssl else None,
+        )
+        return
+
+    _supervise(app_module.app, args, workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Worker lifecycle: warm-up before taking traffic, readiness and drain
+
+The load balancer polls /readyz (routes/health.py) and only routes to
+workers that are warm, not draining, and whose dependencies answer.
+/healthz only says the event loop is alive, a failing dependency must not
+get the worker restarted.
+
+Draining (SIGUSR2, SIGTERM through the launcher, or POST /admin/drain)
+turns readiness off, ends the SSE streams with a reconnect hint, stops
+taking tasks and gives the running ones DRAIN_DEADLINE to finish before
+they are checkpointed for another worker.
+"""
+
+import asyncio
+import os
+import signal
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from src import database
+from src.database import get_db
+from src.utils import cache
+
+WARM_CONNECTIONS = 5  # pooled connections opened before taking traffic
+WARMUP_RETRY_INTERVAL = 5  # seconds, while the database is unreachable
+CHECK_TIMEOUT = 2.0  # seconds per readiness check
+WARMUP_USER_ID = 0  # matches no row, the statements only need to compile
+DRAIN_DEADLINE = float(os.getenv("DRAIN_DEADLINE", "30"))  # seconds for running tasks to finish
+
+
+class WorkerState:
+    def __init__(self):
+        self.warm = False
+        self.started_at = time.time()
+        # Long-running coroutines started by the lifespan, name -> task
+        self.background: Dict[str, asyncio.Task] = {}
+        self.draining = False
+        self.drain_task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def run_in_background(self, name: str, coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coroutine, name=name)
+        self.background[name] = task
+        return task
+
+    def stop_background(self):
+        for task in self.background.values():
+            task.cancel()
+
+    def start_drain(self) -> asyncio.Task:
+        """Start draining, once, from the event loop"""
+        if self.drain_task is None:
+            self.drain_task = asyncio.create_task(_drain(), name="drain")
+        return self.drain_task
+
+    def request_drain(self):
+        """start_drain for signal handlers and other threads"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.start_drain)
+
+    def install_signal_handler(self):
+        """SIGUSR2 drains the worker, called from the lifespan"""
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.loop.add_signal_handler(signal.SIGUSR2, self.start_drain)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # not the main thread (test client) or no signals (Windows)
+
+
+worker = WorkerState()
+
+
+def _open_pool():
+    """Check out connections together, so that the pool keeps them open"""
+    engine = database.init_engine()
+    size = getattr(engine.pool, "size", lambda: 1)()
+    connections = [engine.connect() for _ in range(min(size, WARM_CONNECTIONS))]
+    for connection in connections:
+        connection.close()
+
+
+def _run_hot_statements():
+    # Same statements as the dashboard and the auth dependency: once run,
+    # their compiled SQL is in the engine cache for the first real request
+    from routes.dashboard import _load_websites, _load_active_tasks, _load_subscription, _load_recent_backups
+    from src.crypto import AuthService, AuthError
+
+    _load_websites(WARMUP_USER_ID)
+    _load_active_tasks(WARMUP_USER_ID)
+    _load_subscription(WARMUP_USER_ID)
+    _load_recent_backups(WARMUP_USER_ID)
+
+    token = AuthService.generate_access_token(WARMUP_USER_ID, "warmup", "client")
+    try:
+        AuthService.get_current_user(token)  # decodes the JWT, then queries the user
+    except AuthError:
+        pass
+
+
+async def _warm_up():
+    from routes.hosting import get_hosting_plans
+
+    start = time.perf_counter()
+    await asyncio.to_thread(_open_pool)
+    configure_mappers()
+    await asyncio.to_thread(_run_hot_statements)
+    await get_hosting_plans()  # fills the response cache for /hosting/plans
+    worker.warm = True
+    print(f"🔥 Worker {os.getpid()} warmed up in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+async def _retry_warm_up():
+    while not worker.warm:
+        await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+        try:
+            await _warm_up()
+        except Exception as e:
+            print(f"❌ Warm-up failed: {e}")
+
+
+async def warm_up():
+    """
+    Run the warm-up, from the lifespan. When the database is down it is
+    retried in the background: the worker starts, but stays not ready.
+    """
+    try:
+        await _warm_up()
+    except Exception as e:
+        print(f"❌ Warm-up failed, retrying every {WARMUP_RETRY_INTERVAL}s: {e}")
+        worker.run_in_background("warm_up", _retry_warm_up())
+
+
+async def _drain():
+    from src.task_queue import task_queue
+
+    worker.draining = True
+    print(f"🚰 Worker {os.getpid()} draining, {len(task_queue.running_tasks)} running tasks")
+    totals = await task_queue.drain(DRAIN_DEADLINE)
+    print(f"🚰 Worker {os.getpid()} drained: {totals['finished']} tasks finished, "
+          f"{totals['checkpointed']} checkpointed")
+    return totals
+
+
+def _ping_database():
+    with get_db() as db:
+        db.execute(text("SELECT 1"))
+
+
+def _ping_cache():
+    key = f"readyz:{os.getpid()}"
+    cache.set(key, time.time(), expire=60)
+    if cache.get(key) is None:
+        raise RuntimeError("the cache lost a fresh entry")
+
+
+async def _check(check) -> str:
+    try:
+        await asyncio.wait_for(asyncio.to_thread(check), CHECK_TIMEOUT)
+        return "ok"
+    except asyncio.TimeoutError:
+        return "timeout"
+    except Exception as e:
+        return f"error: {e}"
+
+
+def _check_task_workers() -> str:
+    from src.task_queue import task_queue
+
+    if not task_queue.task_handlers:
+        return "error: no task handler registered"
+    stopped = [name for name, task in worker.background.items() if task.done() and name != "warm_up"]
+    if stopped:
+        return "error: stopped " + ", ".join(sorted(stopped))
+    return "ok"
+
+
+async def readiness() -> dict:
+    """Whether this worker should receive traffic, with each check"""
+    database_check, cache_check = await asyncio.gather(_check(_ping_database), _check(_ping_cache))
+    checks = {
+        "worker": "draining" if worker.draining else ("ok" if worker.warm else "warming up"),
+        "database": database_check,
+        "cache": cache_check,
+        "task_workers": _check_task_workers(),
+    }
+    return {
+        "ready": all(value == "ok" for value in checks.values()),
+        "checks": checks,
+    }
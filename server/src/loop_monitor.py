@@ -0,0 +1,130 @@
+"""
+Event loop lag monitor and blocking call detector
+
+A heartbeat coroutine sleeps HEARTBEAT_INTERVAL at a time and records how
+late it wakes up (event_loop_lag_seconds). A watchdog thread checks the
+heartbeat: once it is BLOCK_THRESHOLD overdue, the loop thread is stuck in
+a callback and its stack is captured right then, while the blocking call
+is still on it. When the loop comes back the heartbeat logs the stack,
+the request or task it belongs to and how long the loop was held, as a
+JSON line (LOOP_BLOCK_LOG, stdout by default), and counts it in
+event_loop_blocked_seconds.
+
+The request or task is found in the locals of the captured frames (the
+ASGI scope, `_process_task`), so requests pay nothing for it.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Optional
+
+from src.access_log import JsonLineSink
+from src.metrics import LOOP_LAG, LOOP_BLOCKED, route_template
+
+HEARTBEAT_INTERVAL = 0.05  # seconds
+BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.1"))  # seconds the loop may be held
+MAX_FRAMES = 40
+
+blocked_log = JsonLineSink(os.getenv("LOOP_BLOCK_LOG"))
+
+
+def _describe(loop, frame) -> dict:
+    """Request, task and stack the loop thread is running, from a frame"""
+    from src.task_queue import task_queue
+
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()  # outermost first
+
+    culprit = {"source": "other"}
+    asyncio_task = asyncio.current_task(loop)
+    if asyncio_task is not None:
+        culprit["asyncio_task"] = asyncio_task.get_name()
+        if not asyncio_task.get_name().startswith("Task-"):
+            culprit["source"] = asyncio_task.get_name()  # lifespan background tasks are named
+
+    for position, frame in enumerate(frames):
+        scope = frame.f_locals.get("scope")
+        if "request" not in culprit and isinstance(scope, dict) and scope.get("type") == "http":
+            culprit["request"] = f"{scope['method']} {scope['path']}"
+            culprit["source"] = f"{scope['method']} {route_template(scope)}"
+        if frame.f_code.co_name == "_process_task" and "task_id" in frame.f_locals:
+            culprit["task_id"] = frame.f_locals["task_id"]
+            handlers = {getattr(handler, "__code__", None) for handler in task_queue.task_handlers.values()}
+            handler = next((inner.f_code.co_name for inner in frames[position + 1:] if inner.f_code in handlers), None)
+            # Blocked in the handler, or in the queue's own bookkeeping
+            culprit["source"] = f"task:{handler or 'queue'}"
+
+    culprit["stack"] = [
+        f"{entry.filename}:{entry.lineno} in {entry.name}" + (f": {entry.line}" if entry.line else "")
+        for entry in traceback.extract_stack(frames[-1], limit=MAX_FRAMES)
+    ]
+    return culprit
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = HEARTBEAT_INTERVAL, threshold: float = BLOCK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.beat = None  # time.monotonic() of the last heartbeat
+        self._captured: Optional[tuple] = None  # (beat, culprit) taken by the watchdog
+        self._loop = None
+        self._loop_thread = None
+        self._thread = None
+
+    async def run(self):
+        """Heartbeat, run as a background task of each worker"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+        while True:
+            self.beat = time.monotonic()
+            expected = self._loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(self._loop.time() - expected, 0)
+            LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                self._report(lag)
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval / 2)
+            beat = self.beat
+            if beat is None or time.monotonic() - beat < self.interval + self.threshold:
+                continue
+            if self._captured is not None and self._captured[0] == beat:
+                continue  # this block is already captured
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                try:
+                    self._captured = (beat, _describe(self._loop, frame))
+                except Exception as e:
+                    self._captured = (beat, {"source": "other", "error": f"stack capture failed: {e}"})
+
+    def _report(self, lag: float):
+        captured, self._captured = self._captured, None
+        # A capture from this beat, else the loop was only busy, not held by one call
+        culprit = captured[1] if captured and captured[0] == self.beat else {"source": "other", "stack": None}
+        LOOP_BLOCKED.labels(culprit["source"]).observe(lag)
+        blocked_log.emit({
+            "ts": datetime.utcnow().isoformat(),
+            "event": "event_loop_blocked",
+            "worker": os.getpid(),
+            "blocked_ms": round(lag * 1000, 1),
+            "threshold_ms": round(self.threshold * 1000, 1),
+            **culprit,
+        })
+
+
+# Global monitor instance
+loop_monitor = LoopMonitor()
@@ -0,0 +1,236 @@
+"""
+Prometheus metrics for HTTP, database pool, caches, limiters, SSE and the
+event loop
+
+With several workers, the launcher points PROMETHEUS_MULTIPROC_DIR at a
+fresh directory before the app is imported: every worker writes its
+values to memory-mapped files there and /metrics, whichever worker
+answers it, merges all of them. Without it (debug) the default
+in-process registry is used.
+
+The request path only touches three instruments per request. Everything
+else (pool, caches, limiters, SSE clients) is sampled by each worker
+every SAMPLE_INTERVAL seconds, so scrapes and the sampler cost
+nothing on the hot path. Cache and limiter counters kept by their owners
+are exported as deltas, which keeps them true Prometheus counters. The
+loop lag and blocked loop histograms are fed by src/loop_monitor.py.
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter as _Counts
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
+)
+
+SAMPLE_INTERVAL = 5.0  # seconds
+UNMATCHED_ROUTE = "<unmatched>"  # 404s and files served before routing, keeps label values bounded
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests answered", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to the end of the response", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests being answered", multiprocess_mode="livesum"
+)
+
+DB_POOL = Gauge(
+    "db_pool_connections", "Connections of the worker's SQLAlchemy pool", ["state"], multiprocess_mode="liveall"
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Tiered cache lookups, hit ratio: sum(rate(result=~'l1_hit|l2_hit')) / sum(rate())",
+    ["cache", "result"]
+)
+CACHE_L1_ENTRIES = Gauge(
+    "cache_l1_entries", "Entries in the in-process tier", ["cache"], multiprocess_mode="liveall"
+)
+LIMITER = Gauge(
+    "concurrency_limiter", "Adaptive limit, admitted in flight and queued requests", ["group", "value"],
+    multiprocess_mode="liveall"
+)
+SHED = Counter(
+    "concurrency_shed_total", "Requests answered 503 by the concurrency limiter", ["group"]
+)
+SSE_CLIENTS = Gauge(
+    "sse_clients", "Connected task event streams", multiprocess_mode="liveall"
+)
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay of a timer on the event loop past its deadline",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+LOOP_BLOCKED = Histogram(
+    "event_loop_blocked_seconds", "Times a single callback held the event loop past the threshold, by culprit",
+    ["source"], buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+TASK_QUEUE_WAIT = Histogram(
+    "task_queue_wait_seconds", "Time from a task's creation, or checkpoint, to its start", ["task_type"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+TASK_RUN = Histogram(
+    "task_run_seconds", "Time from a task's start to its end", ["task_type", "status"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+TASK_STEP = Histogram(
+    "task_step_seconds", "Time spent in each current_step of a task", ["task_type", "step"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+TASKS_FINISHED = Counter(
+    "tasks_finished_total", "Task runs by outcome, failure rate: failed / (completed + failed)",
+    ["task_type", "status"]
+)
+TASKS_RUNNING = Gauge(
+    "tasks_running", "Tasks being run", ["task_type"], multiprocess_mode="livesum"
+)
+
+# TieredCache counter -> result label
+CACHE_RESULTS = {"l1_hits": "l1_hit", "l2_hits": "l2_hit", "misses": "miss", "coalesced": "coalesced"}
+
+
+_prefixes: Dict[int, str] = {}  # id(route) -> router prefix last seen, routes are unhashable
+
+
+def _route_prefix(route, path: str) -> str:
+    # The route in the scope only knows its path within its router: the
+    # router prefix is what comes before the suffix its regex matches
+    for split in range(len(path) + 1):
+        if (split == len(path) or path[split] == "/") and route.path_regex.match(path[split:]):
+            return path[:split]
+    return ""
+
+
+def route_template(scope) -> str:
+    """
+    Template of the route that answered, e.g. /websites/{website_id}. The
+    router stores it in the scope it was given, which is the middlewares'
+    scope too, so it is known once the app ran. Route prefixes must not
+    contain parameters, they would end up in labels.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    prefix = _prefixes.get(id(route))
+    if prefix is None or not (path.startswith(prefix) and route.path_regex.match(path[len(prefix):])):
+        prefix = _prefixes[id(route)] = _route_prefix(route, path)
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware counting requests by route template"""
+
+    def __init__(self, app):
+        self.app = app
+        # (method, route, status) -> (counter child, histogram child)
+        self._children: Dict[Tuple[str, str, int], tuple] = {}
+
+    def _instruments(self, method: str, route: str, status: int) -> tuple:
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            children = (REQUESTS.labels(method, route, str(status)), LATENCY.labels(method, route))
+            self._children[key] = children
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            requests, latency = self._instruments(scope["method"], route_template(scope), status_code)
+            requests.inc()
+            latency.observe(time.perf_counter() - start)
+
+
+class _Deltas:
+    """Turns cumulative in-process counts into counter increments"""
+
+    def __init__(self):
+        self._last = _Counts()
+
+    def inc(self, counter, labels: tuple, value: int):
+        key = (counter._name, labels)
+        delta = value - self._last[key]
+        if delta > 0:
+            counter.labels(*labels).inc(delta)
+        self._last[key] = value
+
+
+_deltas = _Deltas()
+
+
+def sample():
+    """Read the worker's pool, caches, limiters and SSE clients into gauges"""
+    from src import database
+    from src.concurrency import limiters
+    from src.task_queue import task_queue
+    from src.tiered_cache import TieredCache
+
+    pool = database.engine.pool if database.engine is not None else None
+    if pool is not None and hasattr(pool, "checkedout"):
+        DB_POOL.labels("size").set(pool.size())
+        DB_POOL.labels("checked_out").set(pool.checkedout())
+        DB_POOL.labels("idle").set(pool.checkedin())
+        DB_POOL.labels("overflow").set(max(pool.overflow(), 0))
+
+    for tiered in TieredCache.instances:
+        stats = tiered.stats()
+        for metric, result in CACHE_RESULTS.items():
+            _deltas.inc(CACHE_REQUESTS, (tiered.name, result), stats[metric])
+        CACHE_L1_ENTRIES.labels(tiered.name).set(stats["l1_size"])
+
+    for name, limiter in limiters.items():
+        stats = limiter.stats()
+        for value in ("limit", "inflight", "queued_now"):
+            LIMITER.labels(name, value).set(stats[value])
+        _deltas.inc(SHED, (name,), stats["shed"])
+
+    SSE_CLIENTS.set(sum(len(queues) for queues in task_queue.sse_clients.values()))
+
+
+async def run_sampler(interval: float = SAMPLE_INTERVAL):
+    """Sample the gauges, on every worker"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            sample()
+        except Exception as e:
+            print(f"❌ Metrics sampling failed: {e}")
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition of every worker's metrics, and its content type"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of an exited worker, called by the launcher"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
@@ -2,26 +2,13 @@ from datetime import datetime, timezone, timedelta, date
 
 from src.utils import *
 
-from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException, Depends, Header, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse, FileResponse
-
-from sqlalchemy import DateTime, Table, create_engine, Column, Integer, String, Boolean, ForeignKey, select, Enum as SQLEnum, Text
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import DateTime, Column, Integer, String, Boolean, ForeignKey, Enum as SQLEnum, Text, Index
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from typing import List, Optional
-from contextlib import asynccontextmanager
-import os
-from typing import List
-from uuid import uuid4
-import json
-import asyncio
 import enum
 
-from werkzeug.security import generate_password_hash, check_password_hash
-
 from src.database import Base
 
 def jsonObject(inst):
@@ -54,11 +41,19 @@ class User(Base):
     websites = relationship("Website", back_populates="user", cascade="all, delete-orphan")
     sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Admin search, n-grams so that substrings and typos still match
+        Index("ft_users_search", "email", "first_name", "last_name", mysql_prefix="FULLTEXT", mysql_with_parser="ngram"),
+    )
 
+
+    # werkzeug is only needed by the auth routes, not to import the models
     def set_password(self, password: str):
+        from werkzeug.security import generate_password_hash
         self.password = generate_password_hash(password)
 
     def check_password(self, password: str) -> bool:
+        from werkzeug.security import check_password_hash
         return check_password_hash(self.password, password)
     
     def is_locked(self) -> bool:
@@ -157,7 +152,7 @@ class Website(Base):
     __tablename__ = "websites"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    name = Column(String(255), nullable=False)
+    name = Column(String(255), nullable=False, index=True)
     status = Column(SQLEnum(WebsiteStatus), default=WebsiteStatus.INSTALLING, nullable=False, index=True)
     site_path = Column(String(500), nullable=False)
 
@@ -176,6 +171,9 @@ class Website(Base):
     logs = relationship("ActivityLog", back_populates="website", cascade="all, delete-orphan")
     backups = relationship("Backup", back_populates="website", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ft_websites_search", "name", mysql_prefix="FULLTEXT", mysql_with_parser="ngram"),
+    )
 
     def to_dict(self):
         return {
@@ -410,6 +408,7 @@ class Task(Base):
 
     # Timestamps
     created_at = Column(DateTime, default=func.now(), nullable=False)
+    queued_at = Column(DateTime, default=func.now(), nullable=False)  # created, or checkpointed back to PENDING
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
 
@@ -501,17 +500,26 @@ class Subscription(Base):
     user = relationship("User")
     plan = relationship("HostingPlan", back_populates="subscriptions")
 
-    def to_dict(self):
-        return {
+    __table_args__ = (
+        # Range scans of due periods by the billing rollover job
+        Index("ix_subscriptions_status_period_end", "status", "current_period_end"),
+    )
+
+    def to_dict(self, include_plan: bool = True):
+        data = {
             'id': self.id,
             'user_id': self.user_id,
-            'plan': self.plan.to_dict() if self.plan else None,
+            'plan_id': self.plan_id,
             'status': self.status,
             'current_period_start': self.current_period_start.isoformat() if self.current_period_start else None,
             'current_period_end': self.current_period_end.isoformat() if self.current_period_end else None,
             'cancel_at_period_end': self.cancel_at_period_end,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
+        # Lazy-loads the plan, callers serializing many rows should opt out
+        if include_plan:
+            data['plan'] = self.plan.to_dict() if self.plan else None
+        return data
 
 
 class Domain(Base):
@@ -540,6 +548,10 @@ class Domain(Base):
     user = relationship("User")
     website = relationship("Website")
 
+    __table_args__ = (
+        Index("ft_domains_search", "domain_name", mysql_prefix="FULLTEXT", mysql_with_parser="ngram"),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -552,4 +564,31 @@ class Domain(Base):
             'ssl_expires_at': self.ssl_expires_at.isoformat() if self.ssl_expires_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'verified_at': self.verified_at.isoformat() if self.verified_at else None,
-        }
\ No newline at end of file
+        }
+
+class FleetRollup(Base):
+    """Precomputed fleet counters, kept up to date by src.rollups"""
+    __tablename__ = "fleet_rollups"
+
+    metric = Column(String(50), primary_key=True)  # e.g. "websites.status"
+    bucket = Column(String(50), primary_key=True)  # enum name or plan id
+    count = Column(Integer, default=0, nullable=False)
+
+
+class ChangeJournal(Base):
+    """Per-user change log read by the delta-sync endpoint, written by src.journal"""
+    __tablename__ = "change_journal"
+
+    id = Column(Integer, primary_key=True)  # Doubles as the sync version
+    user_id = Column(Integer, nullable=False)
+    entity = Column(String(20), nullable=False)  # website, backup, task, domain, subscription
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # upsert, delete
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Sync reads: one user's entries after a version
+        Index("ix_change_journal_user_version", "user_id", "id"),
+        # Compaction: entries superseded by a later one for the same entity
+        Index("ix_change_journal_entity", "user_id", "entity", "entity_id"),
+    )
@@ -0,0 +1,314 @@
+"""
+On-demand sampling profiles of single requests, for admins
+
+An admin sends `X-Profile: 1` with any request. While it runs, a thread
+samples the event loop thread whenever the request's task is the one
+running, and the threads executing its SQL statements, whose samples get
+the statement as a leaf frame so DB time shows up in the flamegraph. The
+profile is stored in the shared cache and its id returned in the
+X-Profile-Id response header, see GET /admin/profiles/{id}.
+
+Requests without `X-Profile: 1` only pay a header lookup: no sampler, and the
+SQL listeners are attached only while a profile runs.
+"""
+
+import asyncio
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import event
+
+from src import database
+from src.utils import cache
+
+PROFILE_HEADER = b"x-profile"
+SAMPLE_INTERVAL = 0.001  # seconds
+PROFILE_TTL = 86400  # seconds profiles are kept
+INDEX_KEY = "profiles:index"
+INDEX_SIZE = 50  # most recent profiles listed
+MAX_DEPTH = 128
+TOP_STATEMENTS = 20
+
+Stack = Tuple[str, ...]
+
+_active: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+_listening = 0  # profiles running in this worker, SQL listeners attached while > 0
+
+
+@lru_cache(maxsize=65536)
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def stack_of(frame, limit: int = MAX_DEPTH) -> Stack:
+    """Frame labels from the outermost call to the innermost one"""
+    labels = []
+    while frame is not None and len(labels) < limit:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def statement_label(statement: str) -> str:
+    return "SQL " + re.sub(r"\s+", " ", statement).strip()[:200]
+
+
+def to_collapsed(stacks: Dict[Stack, int]) -> str:
+    """Brendan Gregg's folded format, for flamegraph.pl and most viewers"""
+    return "".join(
+        ";".join(frame.replace(";", ",") for frame in stack) + f" {count}\n"
+        for stack, count in stacks.items()
+    )
+
+
+def to_speedscope(stacks: Dict[Stack, int], name: str, interval_ms: float) -> dict:
+    """Sampled profile in the speedscope file format (www.speedscope.app)"""
+    frames: List[dict] = []
+    index: Dict[str, int] = {}
+    samples = []
+    weights = []
+    for stack, count in stacks.items():
+        sample = []
+        for label in stack:
+            if label not in index:
+                index[label] = len(frames)
+                frames.append({"name": label})
+            sample.append(index[label])
+        samples.append(sample)
+        weights.append(count * interval_ms)
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "hosting-panel",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+class RequestProfile:
+    """Samples of one request, taken by a background thread"""
+
+    def __init__(self, method: str, path: str, interval: float = SAMPLE_INTERVAL):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.sql: Dict[str, list] = {}  # statement -> [count, seconds]
+        self.sql_threads: Dict[int, str] = {}  # thread id -> statement running for this request
+        self.status = None
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profile-{self.id}", daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._started
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if asyncio.current_task(self._loop) is self._task:
+                self._sample(self._loop_thread, frames)
+            for thread_id in list(self.sql_threads):
+                if thread_id != self._loop_thread:
+                    self._sample(thread_id, frames)
+
+    def _sample(self, thread_id: int, frames):
+        frame = frames.get(thread_id)
+        if frame is None:
+            return
+        stack = stack_of(frame)
+        statement = self.sql_threads.get(thread_id)
+        if statement:
+            stack += (statement,)
+        self.stacks[stack] += 1
+
+    def record_sql(self, statement: str, seconds: float):
+        entry = self.sql.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def to_dict(self) -> dict:
+        statements = sorted(self.sql.items(), key=lambda item: -item[1][1])
+        return {
+            "id": self.id,
+            "created_at": datetime.utcnow().isoformat(),
+            "worker": os.getpid(),
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 2),
+            "interval_ms": self.interval * 1000,
+            "samples": sum(self.stacks.values()),
+            "sql": {
+                "count": sum(count for count, _ in self.sql.values()),
+                "time_ms": round(sum(seconds for _, seconds in self.sql.values()) * 1000, 2),
+                "statements": [
+                    {"statement": statement, "count": count, "time_ms": round(seconds * 1000, 2)}
+                    for statement, (count, seconds) in statements[:TOP_STATEMENTS]
+                ],
+            },
+            "stacks": [[list(stack), count] for stack, count in self.stacks.items()],
+        }
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active.get()
+    if profile is not None:
+        label = statement_label(statement)
+        profile.sql_threads[threading.get_ident()] = label
+        context._profile = (profile, label, time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_profile", None)
+    if started is not None:
+        profile, label, start = started
+        profile.record_sql(label, time.perf_counter() - start)
+        profile.sql_threads.pop(threading.get_ident(), None)
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    started = getattr(context, "_profile", None) if context is not None else None
+    if started is not None:
+        started[0].sql_threads.pop(threading.get_ident(), None)
+
+
+_LISTENERS = (
+    ("before_cursor_execute", _before_execute),
+    ("after_cursor_execute", _after_execute),
+    ("handle_error", _handle_error),
+)
+
+
+def _listen():
+    global _listening
+    _listening += 1
+    if _listening == 1:
+        engine = database.init_engine()
+        for name, listener in _LISTENERS:
+            event.listen(engine, name, listener)
+
+
+def _unlisten():
+    global _listening
+    _listening -= 1
+    if _listening == 0:
+        for name, listener in _LISTENERS:
+            event.remove(database.engine, name, listener)
+
+
+def save(profile: RequestProfile):
+    cache.set(f"profile:{profile.id}", profile.to_dict(), expire=PROFILE_TTL)
+    with cache.transact():
+        index = cache.get(INDEX_KEY, default=[])
+        index = [profile.id] + index[:INDEX_SIZE - 1]
+        cache.set(INDEX_KEY, index, expire=PROFILE_TTL)
+
+
+def load(profile_id: str) -> Optional[dict]:
+    return cache.get(f"profile:{profile_id}")
+
+
+def recent() -> List[dict]:
+    """Summaries of the latest profiles still stored, newest first"""
+    summaries = []
+    for profile_id in cache.get(INDEX_KEY, default=[]):
+        profile = load(profile_id)
+        if profile:
+            summaries.append({key: value for key, value in profile.items() if key not in ("stacks", "sql")})
+    return summaries
+
+
+async def _authorize(scope) -> Optional[Tuple[int, str]]:
+    """None when the request comes from an admin, else (status, detail)"""
+    from fastapi import HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+    from routes.auth import get_current_user, get_current_admin_user
+
+    scheme, _, token = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return 401, "Profiling requires an admin token"
+    try:
+        user = await get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+        await get_current_admin_user(user)
+    except HTTPException as e:
+        return e.status_code, e.detail
+    return None
+
+
+async def _send_error(send, status: int, detail: str):
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling requests that carry X-Profile"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (PROFILE_HEADER, b"1") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+
+        denied = await _authorize(scope)
+        if denied:
+            await _send_error(send, *denied)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        _listen()
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop()
+            _active.reset(token)
+            _unlisten()
+            await asyncio.to_thread(save, profile)
+            print(f"🔬 Profiled {profile.method} {profile.path}: {profile.duration * 1000:.1f} ms, "
+                  f"{len(profile.sql)} distinct statements, profile {profile.id}")
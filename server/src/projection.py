@@ -0,0 +1,68 @@
+"""
+Sparse fieldsets and opt-in expansions for API endpoints
+
+fields= is turned into the SELECT list of the query itself, so unrequested
+columns are neither read from the database nor serialized.
+"""
+
+from typing import Iterable, List, Optional, Set, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import inspect
+
+from src.serialization import FastJSONResponse
+
+
+def _split(value: str) -> List[str]:
+    return list(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+
+
+def parse_fields(fields: Optional[str], model, schema: Type[BaseModel]) -> Optional[List[str]]:
+    """
+    Validate a comma-separated fields= parameter against the columns the
+    schema exposes. Returns None when absent (full representation). The id
+    is always included.
+    """
+    if not fields:
+        return None
+
+    allowed = set(schema.model_fields) & set(inspect(model).column_attrs.keys())
+    requested = _split(fields)
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(sorted(allowed))}"
+        )
+    return ["id"] + [f for f in requested if f != "id"]
+
+
+def parse_include(include: Optional[str], allowed: Iterable[str]) -> Set[str]:
+    """Validate a comma-separated include= parameter"""
+    if not include:
+        return set()
+
+    allowed = set(allowed)
+    requested = _split(include)
+    unknown = [i for i in requested if i not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include: {', '.join(unknown)}. Available: {', '.join(sorted(allowed))}"
+        )
+    return set(requested)
+
+
+def project(query, model, fields: List[str]) -> List[dict]:
+    """Run the query selecting only the given columns, one dict per row"""
+    rows = query.with_entities(*(getattr(model, f) for f in fields)).all()
+    return [row._asdict() for row in rows]
+
+
+def sparse_response(response: Response, **content) -> FastJSONResponse:
+    """
+    Return projected rows as is, bypassing the route's response_model which
+    requires every field. Headers set by dependencies (ETag) are kept.
+    """
+    return FastJSONResponse({"success": True, **content}, headers=dict(response.headers))
@@ -0,0 +1,81 @@
+"""
+Cache-aside decorator for route handlers with tag-based invalidation
+"""
+
+from functools import wraps
+from typing import Iterable, Type
+
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+from src.utils import cache, TimestampedCache
+from src.tiered_cache import TieredCache
+
+DEFAULT_EXPIRE = 300  # seconds
+
+response_cache = TimestampedCache('./cache/responses')
+responses = TieredCache(response_cache, name="responses")
+
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+
+def tag_generations(tags: Iterable[str]) -> tuple:
+    return tuple(cache.get(_tag_key(tag), default=0) for tag in tags)
+
+
+def invalidate(*tags: str):
+    """
+    Invalidate every entry carrying one of the tags
+
+    Bumps the tag generation instead of deleting keys, so a single write
+    drops any number of entries, on every worker at once.
+    """
+    for tag in tags:
+        cache.incr(_tag_key(tag), default=0)
+
+
+def cached(
+    key: str,
+    model: Type[BaseModel],
+    tags: Iterable[str] = (),
+    expire: int = DEFAULT_EXPIRE,
+    refresh_after: int = None
+):
+    """
+    Decorator caching the JSON body rendered from a route handler result
+
+    key and tags are format strings over the handler keyword arguments, e.g.
+    "website:{website_id}:{current_user.id}". Only successful results are
+    stored, exceptions propagate untouched. Concurrent misses on the same key
+    run the handler once. With refresh_after, entries older than that are
+    served while being recomputed in the background. Place it below the
+    router decorator.
+
+    Usage:
+        @router.get("/plans/{plan_id}", response_model=PlanEnvelope)
+        @cached("plan:{plan_id}", PlanEnvelope, tags=("plans",))
+        async def get_plan(plan_id: int):
+            ...
+    """
+    adapter = TypeAdapter(model)
+    tags = tuple(tags)
+
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(*args, **kwargs):
+            # The tag generations are part of the key: an invalidation moves
+            # readers to a new key, so no tier can serve the old entry
+            generations = tag_generations(tag.format(**kwargs) for tag in tags)
+            cache_key = "response:" + key.format(**kwargs) + "@" + ".".join(map(str, generations))
+
+            async def render():
+                result = await handler(*args, **kwargs)
+                return adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+
+            body = await responses.get_or_compute(cache_key, render, ttl=expire, soft_ttl=refresh_after)
+            return Response(body, media_type="application/json")
+
+        return wrapper
+    return decorator
@@ -0,0 +1,191 @@
+"""
+Incrementally maintained fleet counters for the admin overview
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import event, func, delete
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.orm import Session, attributes
+
+from src.models import (
+    FleetRollup, User, UserRole, Website, WebsiteStatus,
+    Task, TaskStatus, TaskType, Subscription
+)
+
+
+def _website_buckets(values: dict):
+    return [("websites.status", values["status"].name)]
+
+
+def _task_buckets(values: dict):
+    return [
+        ("tasks.status", values["status"].name),
+        ("tasks.type", values["task_type"].name),
+    ]
+
+
+def _user_buckets(values: dict):
+    return [("users.role", values["role"].name)]
+
+
+def _subscription_buckets(values: dict):
+    if values["status"] != "active":
+        return []
+    return [("subscriptions.plan", str(values["plan_id"]))]
+
+
+# model -> (tracked columns, bucket function)
+TRACKED = {
+    Website: (("status",), _website_buckets),
+    Task: (("status", "task_type"), _task_buckets),
+    User: (("role",), _user_buckets),
+    Subscription: (("status", "plan_id"), _subscription_buckets),
+}
+
+
+def _current_values(obj, columns) -> dict:
+    values = {}
+    for name in columns:
+        value = getattr(obj, name)
+        if value is None:
+            # Python-side defaults are not applied until the INSERT runs
+            default = obj.__table__.c[name].default
+            value = default.arg if default is not None and default.is_scalar else None
+        values[name] = value
+    return values
+
+
+def _previous_values(obj, columns) -> Tuple[dict, bool]:
+    """Values as they were before this flush, and whether any of them changed"""
+    values = {}
+    changed = False
+    for name in columns:
+        history = attributes.get_history(obj, name)
+        if history.deleted:
+            values[name] = history.deleted[0]
+            changed = True
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            values[name] = getattr(obj, name)
+    return values, changed
+
+
+def _collect_deltas(session: Session) -> Counter:
+    deltas = Counter()
+
+    for obj in session.new:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            columns, buckets = tracked
+            for key in buckets(_current_values(obj, columns)):
+                deltas[key] += 1
+
+    for obj in session.dirty:
+        tracked = TRACKED.get(type(obj))
+        if not tracked:
+            continue
+        columns, buckets = tracked
+        previous, changed = _previous_values(obj, columns)
+        if not changed:
+            continue
+        for key in buckets(previous):
+            deltas[key] -= 1
+        for key in buckets(_current_values(obj, columns)):
+            deltas[key] += 1
+
+    for obj in session.deleted:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            columns, buckets = tracked
+            previous, _ = _previous_values(obj, columns)
+            for key in buckets(previous):
+                deltas[key] -= 1
+
+    return Counter({key: delta for key, delta in deltas.items() if delta})
+
+
+def apply_deltas(connection, deltas: Dict[Tuple[str, str], int]):
+    """Add signed deltas to the rollup rows, creating missing buckets"""
+    if not deltas:
+        return
+    stmt = insert(FleetRollup.__table__).values([
+        {"metric": metric, "bucket": bucket, "count": delta}
+        for (metric, bucket), delta in sorted(deltas.items())
+    ])
+    stmt = stmt.on_duplicate_key_update(
+        count=FleetRollup.__table__.c.count + stmt.inserted.count
+    )
+    connection.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_rollups(session: Session, flush_context):
+    """Apply status transitions in the same transaction as the change itself"""
+    apply_deltas(session.connection(), _collect_deltas(session))
+
+
+def _grouped_counts(db: Session) -> Iterable[Tuple[str, str, int]]:
+    for status, count in db.query(Website.status, func.count()).group_by(Website.status):
+        yield "websites.status", status.name, count
+    for status, count in db.query(Task.status, func.count()).group_by(Task.status):
+        yield "tasks.status", status.name, count
+    for task_type, count in db.query(Task.task_type, func.count()).group_by(Task.task_type):
+        yield "tasks.type", task_type.name, count
+    for role, count in db.query(User.role, func.count()).group_by(User.role):
+        yield "users.role", role.name, count
+    for plan_id, count in db.query(Subscription.plan_id, func.count()).filter(
+        Subscription.status == "active"
+    ).group_by(Subscription.plan_id):
+        yield "subscriptions.plan", str(plan_id), count
+
+
+def rebuild(db: Session, metrics: Iterable[str] = None):
+    """
+    Recompute rollups from the source tables (full scan, for repairs and
+    for writers that bypass the ORM such as bulk UPDATE statements)
+    """
+    metrics = set(metrics) if metrics else None
+    rows = [
+        {"metric": metric, "bucket": bucket, "count": count}
+        for metric, bucket, count in _grouped_counts(db)
+        if metrics is None or metric in metrics
+    ]
+
+    stmt = delete(FleetRollup)
+    if metrics is not None:
+        stmt = stmt.where(FleetRollup.metric.in_(metrics))
+    db.execute(stmt)
+    if rows:
+        db.execute(FleetRollup.__table__.insert(), rows)
+    db.commit()
+
+
+def _enum_counts(counts: dict, enum_cls) -> dict:
+    return {member.value: counts.get(member.name, 0) for member in enum_cls}
+
+
+def overview(db: Session) -> dict:
+    """Read the whole rollup table, which is bounded by enums and plans"""
+    counts: Dict[str, Dict[str, int]] = {}
+    for row in db.query(FleetRollup).all():
+        counts.setdefault(row.metric, {})[row.bucket] = row.count
+
+    plans = counts.get("subscriptions.plan", {})
+    return {
+        "websites": {
+            "by_status": _enum_counts(counts.get("websites.status", {}), WebsiteStatus),
+        },
+        "tasks": {
+            "by_status": _enum_counts(counts.get("tasks.status", {}), TaskStatus),
+            "by_type": _enum_counts(counts.get("tasks.type", {}), TaskType),
+        },
+        "users": {
+            "by_role": _enum_counts(counts.get("users.role", {}), UserRole),
+        },
+        "subscriptions": {
+            "active_by_plan": {plan_id: count for plan_id, count in plans.items() if count},
+        },
+    }
@@ -0,0 +1,236 @@
+"""
+Typed response models
+
+Serializers are compiled by pydantic-core once, when the classes are
+defined, and FastAPI uses them to dump responses straight to JSON bytes.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, model_validator
+
+from src.models import UserRole, WebsiteStatus, TaskType, TaskStatus
+
+
+class ORMModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserOut(ORMModel):
+    id: int
+    email: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+    last_login: Optional[datetime]
+    last_login_ip: Optional[str]
+    creation_date: Optional[datetime]
+    failed_login_attempts: Optional[int]
+
+
+class WebsiteOut(ORMModel):
+    id: int
+    user_id: int
+    name: str
+    status: WebsiteStatus
+    site_path: str
+    disk_usage: int
+    disk_quota: Optional[int]
+    backup_enabled: bool
+    backup_frequency: str
+    backup_retention_days: int
+    last_backup_at: Optional[datetime]
+    created_at: Optional[datetime]
+    suspended_at: Optional[datetime]
+
+
+class WebsiteStatsOut(BaseModel):
+    disk_usage: int
+    disk_quota: Optional[int]
+    disk_usage_percentage: float
+    backup_count: int
+    last_backup: Optional[datetime]
+
+
+class BackupOut(ORMModel):
+    id: int
+    website_id: int
+    size: int
+    is_encrypted: bool
+    created_at: Optional[datetime]
+    expires_at: Optional[datetime]
+
+
+class TaskOut(ORMModel):
+    id: int
+    user_id: int
+    website_id: Optional[int]
+    task_type: TaskType
+    status: TaskStatus
+    title: str
+    description: Optional[str]
+    progress: int
+    current_step: Optional[str]
+    total_steps: int
+    error_message: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+
+
+class PlanFeatures(BaseModel):
+    websites: int
+    storage: int
+    bandwidth: int
+    ssl: bool
+    backups: bool
+    staging: bool
+    cdn: bool
+
+
+class PlanOut(ORMModel):
+    id: int
+    name: str
+    price: float  # In dollars
+    features: PlanFeatures
+    is_active: bool
+
+    @model_validator(mode="before")
+    @classmethod
+    def from_plan(cls, data):
+        # Prices are stored in cents and the limits are flat columns
+        if hasattr(data, "max_websites"):
+            return data.to_dict()
+        return data
+
+
+class SubscriptionOut(ORMModel):
+    id: int
+    user_id: int
+    plan: Optional[PlanOut]
+    status: str
+    current_period_start: datetime
+    current_period_end: datetime
+    cancel_at_period_end: bool
+    created_at: Optional[datetime]
+
+
+class DomainOut(ORMModel):
+    id: int
+    user_id: int
+    website_id: Optional[int]
+    domain_name: str
+    is_primary: bool
+    is_verified: bool
+    ssl_enabled: bool
+    ssl_expires_at: Optional[datetime]
+    created_at: Optional[datetime]
+    verified_at: Optional[datetime]
+
+
+class UsageOut(BaseModel):
+    websites_used: int
+    websites_limit: int
+    storage_used_mb: int
+    storage_limit_gb: int
+
+
+# Envelopes
+
+class UserEnvelope(BaseModel):
+    success: bool = True
+    user: UserOut
+
+
+class UserListEnvelope(BaseModel):
+    success: bool = True
+    users: List[UserOut]
+
+
+class WebsiteEnvelope(BaseModel):
+    success: bool = True
+    website: WebsiteOut
+
+
+class WebsiteListEnvelope(BaseModel):
+    success: bool = True
+    websites: List[WebsiteOut]
+
+
+class WebsiteStatsEnvelope(BaseModel):
+    success: bool = True
+    stats: WebsiteStatsOut
+
+
+class BackupEnvelope(BaseModel):
+    success: bool = True
+    backup: BackupOut
+
+
+class BackupListEnvelope(BaseModel):
+    success: bool = True
+    backups: List[BackupOut]
+
+
+class TaskEnvelope(BaseModel):
+    success: bool = True
+    task: TaskOut
+
+
+class TaskListEnvelope(BaseModel):
+    success: bool = True
+    tasks: List[TaskOut]
+
+
+class PlanEnvelope(BaseModel):
+    success: bool = True
+    plan: PlanOut
+
+
+class PlanListEnvelope(BaseModel):
+    success: bool = True
+    plans: List[PlanOut]
+
+
+class DashboardEnvelope(BaseModel):
+    success: bool = True
+    websites: List[WebsiteOut]
+    active_tasks: List[TaskOut]
+    subscription: Optional[SubscriptionOut]
+    usage: Optional[UsageOut]
+    recent_backups: List[BackupOut]
+
+
+class SyncUpserts(BaseModel):
+    websites: List[WebsiteOut] = []
+    backups: List[BackupOut] = []
+    tasks: List[TaskOut] = []
+    domains: List[DomainOut] = []
+    subscriptions: List[SubscriptionOut] = []
+
+
+class SyncDeletes(BaseModel):
+    websites: List[int] = []
+    backups: List[int] = []
+    tasks: List[int] = []
+    domains: List[int] = []
+    subscriptions: List[int] = []
+
+
+class SyncEnvelope(BaseModel):
+    success: bool = True
+    version: int
+    reset: bool = False  # The client is too far behind: reload everything, then sync from version
+    has_more: bool = False
+    upserts: SyncUpserts = SyncUpserts()
+    deletes: SyncDeletes = SyncDeletes()
+
+
+class SearchEnvelope(BaseModel):
+    success: bool = True
+    users: List[UserOut]
+    websites: List[WebsiteOut]
+    domains: List[DomainOut]
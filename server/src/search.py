@@ -0,0 +1,50 @@
+"""
+Admin search over users, websites and domains
+
+Each entity is searched twice, both times through an index: a prefix
+match on a B-tree column (LIKE 'q%'), which ranks first, then a MySQL
+FULLTEXT n-gram match. N-grams score on shared 2-character sequences, so
+substrings and misspelled terms still find their row. The two are not
+OR-ed in one query since MySQL cannot use the FULLTEXT index for that.
+"""
+
+from typing import List
+
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+
+from src.models import User, Website, Domain
+
+MIN_FULLTEXT_LENGTH = 2  # ngram_token_size
+
+# entity -> (model, prefix-indexed column, full-text columns)
+SEARCHABLE = {
+    "users": (User, User.email, (User.email, User.first_name, User.last_name)),
+    "websites": (Website, Website.name, (Website.name,)),
+    "domains": (Domain, Domain.domain_name, (Domain.domain_name,)),
+}
+
+
+def _search(db: Session, model, prefix_column, fulltext_columns, q: str, limit: int) -> List:
+    results = db.query(model).filter(
+        prefix_column.startswith(q, autoescape=True)
+    ).order_by(prefix_column).limit(limit).all()
+
+    if len(results) < limit and len(q) >= MIN_FULLTEXT_LENGTH:
+        relevance = match(*fulltext_columns, against=q).in_natural_language_mode()
+        seen = {row.id for row in results}
+        query = db.query(model).filter(relevance > 0)
+        if seen:
+            query = query.filter(model.id.notin_(seen))
+        results += query.order_by(relevance.desc()).limit(limit - len(results)).all()
+
+    return results
+
+
+def search(db: Session, q: str, limit: int = 10) -> dict:
+    """Up to limit users, websites and domains matching q"""
+    q = q.strip()
+    return {
+        entity: _search(db, model, prefix_column, fulltext_columns, q, limit)
+        for entity, (model, prefix_column, fulltext_columns) in SEARCHABLE.items()
+    }
@@ -0,0 +1,44 @@
+"""
+Fast JSON encoding shared by HTTP responses and SSE messages
+"""
+
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to JSON bytes, with native datetime, enum and dataclass support"""
+    if isinstance(obj, BaseModel):
+        # Typed models go through their compiled pydantic-core serializer
+        return obj.model_dump_json().encode()
+    return orjson.dumps(obj, default=_default, option=OPTIONS)
+
+
+def sse_message(obj: Any, event: str = None, retry: int = None) -> str:
+    """Format a Server-Sent Events message, retry (ms) sets the client reconnection delay"""
+    data = dumps(obj).decode()
+    fields = f"retry: {retry}\n" if retry is not None else ""
+    if event:
+        fields += f"event: {event}\n"
+    return f"{fields}data: {data}\n\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class, renders with orjson instead of json.dumps"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,138 @@
+"""
+Serves the production build of the Angular client from the API
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip only without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".map", ".ico", ".xml"}
+MIN_COMPRESS_SIZE = 1024  # bytes
+
+# Angular output hashing: main-ABCD1234.js, chunk-ABCD1234.js, media/font-ABCD1234.woff2
+HASHED_NAME = re.compile(r"-[A-Za-z0-9]{8,}\.\w+$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Browser navigations to these are left to the API
+API_HTML_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+
+class ClientBuild:
+    """
+    Index of the build directory, with gzip (and brotli when installed)
+    variants written next to the files at startup, like nginx gzip_static
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.realpath(directory)
+        self.files: Dict[str, dict] = {}  # url path -> file entry
+
+    def load(self):
+        """Index the build and precompress it, run once at startup"""
+        written = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith((".gz", ".br")):
+                    continue
+                path = os.path.join(root, name)
+                url = "/" + os.path.relpath(path, self.directory).replace(os.sep, "/")
+                variants = {}
+                if os.path.splitext(name)[1] in COMPRESSIBLE_EXTENSIONS and os.path.getsize(path) >= MIN_COMPRESS_SIZE:
+                    for encoding, compress in (("br", brotli and brotli.compress), ("gzip", lambda data: gzip.compress(data, 9))):
+                        if compress:
+                            variant, fresh = self._precompress(path, encoding, compress)
+                            if variant:
+                                variants[encoding] = self._stat(variant)
+                                written += fresh
+                self.files[url] = {
+                    **self._stat(path),
+                    "media_type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+                    "cache_control": IMMUTABLE if HASHED_NAME.search(name) else REVALIDATE,
+                    "variants": variants,
+                }
+        print(f"📦 Serving the client from {self.directory} ({len(self.files)} files, {written} precompressed)")
+
+    def _precompress(self, path: str, encoding: str, compress):
+        variant = path + (".br" if encoding == "br" else ".gz")
+        if os.path.exists(variant) and os.path.getmtime(variant) >= os.path.getmtime(path):
+            return variant, 0
+        try:
+            with open(path, "rb") as f:
+                data = compress(f.read())
+            with open(variant, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            print(f"⚠️ Could not precompress {path}: {e}")
+            return None, 0
+        return variant, 1
+
+    @staticmethod
+    def _stat(path: str) -> dict:
+        stat = os.stat(path)
+        return {"path": path, "etag": f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'}
+
+    def lookup(self, path: str) -> Optional[dict]:
+        return self.files.get(path)
+
+
+class StaticClientMiddleware:
+    """
+    Pure ASGI middleware in front of the API
+
+    Existing build files are served directly. Other browser navigations
+    (GET accepting text/html) get index.html, so client routes such as
+    /websites work on reload while API calls to the same paths, which
+    accept JSON, go through.
+    """
+
+    def __init__(self, app, build: ClientBuild):
+        self.app = app
+        self.build = build
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        entry = self.build.lookup(scope["path"])
+        if entry is None:
+            navigation = b"text/html" in headers.get(b"accept", b"")
+            if not navigation or scope["path"].startswith(API_HTML_PATHS):
+                await self.app(scope, receive, send)
+                return
+            entry = self.build.lookup("/index.html")
+            if entry is None:
+                await self.app(scope, receive, send)
+                return
+
+        await self._serve(entry, headers, scope, receive, send)
+
+    async def _serve(self, entry: dict, headers: dict, scope, receive, send):
+        accept_encoding = headers.get(b"accept-encoding", b"").decode("latin-1")
+        encoding = next((e for e in ("br", "gzip") if e in entry["variants"] and e in accept_encoding), None)
+        variant = entry["variants"][encoding] if encoding else entry
+
+        response_headers = {"Cache-Control": entry["cache_control"], "ETag": variant["etag"]}
+        if entry["variants"]:
+            response_headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1")
+        if variant["etag"] in (tag.strip() for tag in if_none_match.split(",")):
+            response = Response(status_code=304, headers=response_headers)
+        else:
+            response = FileResponse(variant["path"], media_type=entry["media_type"], headers=response_headers)
+        await response(scope, receive, send)
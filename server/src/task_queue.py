@@ -1,11 +1,33 @@
 import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Optional, Callable, Any
+from sqlalchemy import func
 from src.database import get_db
 from src.models import Task, TaskType, TaskStatus, ActivityLog, ActivityType, ActivityLevel
+from src.schemas import TaskOut
+from src.serialization import sse_message
+from src import versions, journal, rollups, tracing
+from src.response_cache import invalidate
+from src.task_telemetry import task_telemetry, COMPLETED, FAILED, CHECKPOINTED
 import traceback
 
+# Pending tasks older than this are assumed to have no worker coming for
+# them (enqueued on a draining worker, or checkpointed by one)
+RECOVERY_GRACE = 10  # seconds
+RECOVERY_INTERVAL = 5  # seconds
+RECOVERY_BATCH_SIZE = 20
+SSE_RETRY_MS = 1000  # how long EventSource clients wait before reconnecting
+
+# Put on an SSE client queue to end its stream
+STREAM_END = object()
+
+
+def end_stream(queue: asyncio.Queue, retry_ms: int = SSE_RETRY_MS):
+    """Queue a final event telling the client to reconnect, then the end"""
+    queue.put_nowait(sse_message({"reconnect": True}, event="draining", retry=retry_ms))
+    queue.put_nowait(STREAM_END)
+
 
 class TaskQueue:
     """Manages background task execution with SSE progress updates"""
@@ -14,6 +36,7 @@ class TaskQueue:
         self.running_tasks: Dict[int, asyncio.Task] = {}
         self.task_handlers: Dict[TaskType, Callable] = {}
         self.sse_clients: Dict[int, list] = {}  # user_id -> list of queues
+        self.accepting = True  # False once draining, tasks are left to other workers
 
     def register_handler(self, task_type: TaskType, handler: Callable):
         """Register a task handler function"""
@@ -31,7 +54,10 @@ class TaskQueue:
 
         print(f"➕ New {task_type} task: {title}")
 
-        with get_db() as db:
+        with tracing.span("enqueue_task", kind=tracing.PRODUCER, **{"task.type": task_type.value}) as span, \
+                get_db() as db:
+            # Whichever worker runs the task continues this trace
+            input_data = tracing.inject(input_data)
             task = Task(
                 user_id=user_id,
                 website_id=website_id,
@@ -47,48 +73,85 @@ class TaskQueue:
             db.commit()
             db.refresh(task)
             task_id = task.id
+            if span:
+                span.set(**{"task.id": task_id})
 
-        # Start processing the task in the background
-        asyncio.create_task(self._process_task(task_id))
+        versions.bump(user_id, "tasks")
 
+        if self.accepting:
+            # Start processing the task in the background
+            self._start(task_id)
+        else:
+            print(f"⏸️ Draining, task {task_id} is left pending for another worker")
+
+        return task
+
+    def _start(self, task_id: int):
+        runner = asyncio.create_task(self._process_task(task_id))
+        self.running_tasks[task_id] = runner
+        runner.add_done_callback(lambda _: self.running_tasks.pop(task_id, None))
+
+    def _claim(self, db, task_id: int) -> Optional[Task]:
+        """
+        Move a task from PENDING to RUNNING, None when another worker did
+        first: a conditional UPDATE, so exactly one worker runs each task
+        """
+        # started_at by the database clock, like queued_at: the queue wait is their difference
+        claimed = db.query(Task).filter(
+            Task.id == task_id,
+            Task.status == TaskStatus.PENDING
+        ).update({"status": TaskStatus.RUNNING, "started_at": func.now()}, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            return None
+
+        task = db.query(Task).filter(Task.id == task_id).first()
+        # The bulk UPDATE bypasses the flush listeners
+        rollups.apply_deltas(db.connection(), {
+            ("tasks.status", TaskStatus.PENDING.name): -1,
+            ("tasks.status", TaskStatus.RUNNING.name): 1,
+        })
+        journal.record(db.connection(), journal.entries_for("task", journal.UPSERT, [(task.id, task.user_id)]))
+        db.commit()
         return task
 
     async def _process_task(self, task_id: int):
         """Process a task in the background"""
         try:
             with get_db() as db:
-                task = db.query(Task).filter(Task.id == task_id).first()
+                task = self._claim(db, task_id)
                 if not task:
                     return
+                task_telemetry.started(task)
 
-                # Update task status to RUNNING
-                task.status = TaskStatus.RUNNING
-                task.started_at = datetime.utcnow()
-                db.commit()
+                # Parse input data
+                input_data = json.loads(task.input_data) if task.input_data else {}
 
-                # Broadcast task started
-                await self._broadcast_task_update(task.user_id, task)
+                with tracing.span(f"task {task.task_type.value}", kind=tracing.CONSUMER, root=True,
+                                  traceparent=input_data.pop(tracing.TRACE_KEY, None),
+                                  **{"task.id": task_id, "task.type": task.task_type.value}):
+                    # Broadcast task started
+                    await self._broadcast_task_update(task.user_id, task)
 
-                # Get handler for this task type
-                handler = self.task_handlers.get(task.task_type)
-                if not handler:
-                    raise Exception(f"No handler registered for task type: {task.task_type.value}")
+                    # Get handler for this task type
+                    handler = self.task_handlers.get(task.task_type)
+                    if not handler:
+                        raise Exception(f"No handler registered for task type: {task.task_type.value}")
 
-                # Parse input data
-                input_data = json.loads(task.input_data) if task.input_data else {}
+                    # Execute the handler
+                    result = await handler(task_id, input_data, self._update_progress)
 
-                # Execute the handler
-                result = await handler(task_id, input_data, self._update_progress)
+                    # Mark task as completed
+                    task.status = TaskStatus.COMPLETED
+                    task.completed_at = datetime.utcnow()
+                    task.progress = 100
+                    task.result_data = json.dumps(result) if result else None
+                    db.commit()
 
-                # Mark task as completed
-                task.status = TaskStatus.COMPLETED
-                task.completed_at = datetime.utcnow()
-                task.progress = 100
-                task.result_data = json.dumps(result) if result else None
-                db.commit()
+                    # Broadcast task completed
+                    await self._broadcast_task_update(task.user_id, task)
 
-                # Broadcast task completed
-                await self._broadcast_task_update(task.user_id, task)
+                await task_telemetry.finished(task_id, COMPLETED)
 
                 # Log activity
                 activity = ActivityLog(
@@ -102,7 +165,15 @@ class TaskQueue:
                 db.add(activity)
                 db.commit()
 
+        except asyncio.CancelledError:
+            # Interrupted by a drain: back to PENDING with its progress, for
+            # another worker to claim. Handlers run again from the start.
+            await self._checkpoint(task_id)
+            await task_telemetry.finished(task_id, CHECKPOINTED)
+            raise
+
         except Exception as e:
+            await task_telemetry.finished(task_id, FAILED)
             # Mark task as failed
             with get_db() as db:
                 task = db.query(Task).filter(Task.id == task_id).first()
@@ -129,14 +200,62 @@ class TaskQueue:
                     db.add(activity)
                     db.commit()
 
+    async def _checkpoint(self, task_id: int):
+        with get_db() as db:
+            task = db.query(Task).filter(Task.id == task_id).first()
+            if task and task.status == TaskStatus.RUNNING:
+                task.status = TaskStatus.PENDING
+                task.started_at = None
+                # The next run waits from now, not from its creation
+                task.queued_at = func.now()
+                db.commit()
+                await self._broadcast_task_update(task.user_id, task)
+                print(f"💾 Task {task_id} checkpointed at {task.progress}%")
+
+    async def recover(self):
+        """Start the pending tasks that no worker is running"""
+        with get_db() as db:
+            # created_at is set by the database clock
+            cutoff = db.query(func.now()).scalar() - timedelta(seconds=RECOVERY_GRACE)
+            stale = db.query(Task.id).filter(
+                Task.status == TaskStatus.PENDING,
+                Task.created_at < cutoff
+            ).order_by(Task.id).limit(RECOVERY_BATCH_SIZE).all()
+
+        for (task_id,) in stale:
+            if task_id not in self.running_tasks:
+                self._start(task_id)
+
+    def close_streams(self, retry_ms: int = SSE_RETRY_MS):
+        """End every SSE stream, telling clients to reconnect (elsewhere)"""
+        for queues in self.sse_clients.values():
+            for queue in queues:
+                end_stream(queue, retry_ms)
+
+    async def drain(self, deadline: float) -> dict:
+        """
+        Stop taking tasks, close the SSE streams, then wait up to deadline
+        seconds for the running tasks and checkpoint the ones left
+        """
+        self.accepting = False
+        self.close_streams()
+
+        running = list(self.running_tasks.values())
+        finished, left = await asyncio.wait(running, timeout=deadline) if running else (set(), set())
+        for runner in left:
+            runner.cancel()
+        await asyncio.gather(*left, return_exceptions=True)
+        return {"finished": len(finished), "checkpointed": len(left)}
+
     async def _update_progress(self, task_id: int, progress: int, current_step: str = None):
         """Update task progress and broadcast to SSE clients"""
-        with get_db() as db:
+        with tracing.span("update_progress", progress=progress, step=current_step), get_db() as db:
             task = db.query(Task).filter(Task.id == task_id).first()
             if task:
                 task.progress = progress
                 if current_step:
                     task.current_step = current_step
+                    task_telemetry.step(task_id, current_step)
                 db.commit()
 
                 # Broadcast progress update
@@ -144,16 +263,19 @@ class TaskQueue:
 
     async def _broadcast_task_update(self, user_id: int, task: Task):
         """Broadcast task update to all SSE clients for this user"""
+        # Every committed task change goes through here
+        versions.bump(user_id, "tasks")
+
         if user_id in self.sse_clients:
-            task_data = task.to_dict()
-            message = f"data: {json.dumps(task_data)}\n\n"
+            with tracing.span("sse_broadcast", clients=len(self.sse_clients[user_id])):
+                message = sse_message(TaskOut.model_validate(task))
 
-            # Send to all connected clients for this user
-            for queue in self.sse_clients[user_id]:
-                try:
-                    await queue.put(message)
-                except:
-                    pass  # Client disconnected
+                # Send to all connected clients for this user
+                for queue in self.sse_clients[user_id]:
+                    try:
+                        await queue.put(message)
+                    except:
+                        pass  # Client disconnected
 
     def add_sse_client(self, user_id: int, queue: asyncio.Queue):
         """Register an SSE client for a user"""
@@ -176,6 +298,16 @@ class TaskQueue:
 task_queue = TaskQueue()
 
 
+async def run_task_recovery(interval: int = RECOVERY_INTERVAL):
+    """Periodically claim the pending tasks left behind by other workers"""
+    while task_queue.accepting:
+        try:
+            await task_queue.recover()
+        except Exception as e:
+            print(f"❌ Task recovery failed: {e}")
+        await asyncio.sleep(interval)
+
+
 # Example task handlers
 
 async def create_website_task(task_id: int, data: dict, update_progress: Callable):
@@ -202,6 +334,8 @@ async def create_website_task(task_id: int, data: dict, update_progress: Callabl
         if website:
             website.status = WebsiteStatus.ACTIVE
             db.commit()
+            versions.bump(website.user_id, "websites")
+            invalidate(f"website:{website.id}")
 
     return {"success": True, "message": "Website created successfully"}
 
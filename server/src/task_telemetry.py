@@ -0,0 +1,142 @@
+"""
+Task execution telemetry per TaskType
+
+For every task run: queue wait (queued_at -> started_at), run time,
+the duration of each step (from one `current_step` to the next in
+`_update_progress`) and how it ended. Each run feeds the Prometheus
+task_* metrics and a record in a diskcache Deque per task type, shared
+by the workers, from which the admin summary computes percentiles over
+sliding windows.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+import diskcache as dc
+
+from src.metrics import TASK_QUEUE_WAIT, TASK_RUN, TASK_STEP, TASKS_FINISHED, TASKS_RUNNING
+
+TELEMETRY_DIRECTORY = "./cache/task_telemetry"
+RECORDS_KEPT = 5000  # latest runs per task type, bounds the 24h window of busy types
+WINDOWS = {"1h": 3600, "24h": 86400}  # seconds
+PERCENTILES = (50, 95, 99)
+
+COMPLETED, FAILED, CHECKPOINTED = "completed", "failed", "checkpointed"
+
+
+class _Run:
+    __slots__ = ("task_type", "wait", "started", "step", "step_started", "steps")
+
+    def __init__(self, task_type: str, wait: float):
+        self.task_type = task_type
+        self.wait = wait
+        self.started = time.monotonic()
+        self.step = None
+        self.step_started = self.started
+        self.steps: Dict[str, float] = {}
+
+    def close_step(self, now: float):
+        if self.step is not None:
+            duration = now - self.step_started
+            self.steps[self.step] = self.steps.get(self.step, 0.0) + duration
+            TASK_STEP.labels(self.task_type, self.step).observe(duration)
+        self.step_started = now
+
+
+class TaskTelemetry:
+    def __init__(self, directory: str = TELEMETRY_DIRECTORY):
+        self.directory = directory
+        self.runs: Dict[int, _Run] = {}  # task id -> run in progress on this worker
+        self._deques: Dict[str, dc.Deque] = {}
+
+    def _deque(self, task_type: str) -> dc.Deque:
+        if task_type not in self._deques:
+            self._deques[task_type] = dc.Deque(directory=os.path.join(self.directory, task_type), maxlen=RECORDS_KEPT)
+        return self._deques[task_type]
+
+    def started(self, task):
+        """Called once the task is claimed, started_at is set"""
+        task_type = task.task_type.value
+        # Both set by the database clock
+        wait = (task.started_at - task.queued_at).total_seconds()
+        self.runs[task.id] = _Run(task_type, wait)
+        TASK_QUEUE_WAIT.labels(task_type).observe(wait)
+        TASKS_RUNNING.labels(task_type).inc()
+
+    def step(self, task_id: int, current_step: str):
+        run = self.runs.get(task_id)
+        if run is not None and current_step != run.step:
+            run.close_step(time.monotonic())
+            run.step = current_step
+
+    async def finished(self, task_id: int, status: str):
+        """Called when the run ends: completed, failed or checkpointed"""
+        run = self.runs.pop(task_id, None)
+        if run is None:
+            return
+        now = time.monotonic()
+        run.close_step(now)
+        duration = now - run.started
+
+        TASKS_RUNNING.labels(run.task_type).dec()
+        TASKS_FINISHED.labels(run.task_type, status).inc()
+        TASK_RUN.labels(run.task_type, status).observe(duration)
+
+        record = (time.time(), status, run.wait, duration, run.steps)
+        try:
+            await asyncio.to_thread(self._deque(run.task_type).append, record)
+        except Exception as e:
+            print(f"❌ Could not store the telemetry of task {task_id}: {e}")
+
+    def _records(self, task_type: str) -> List[tuple]:
+        return list(self._deque(task_type))
+
+    def summary(self, task_types: List[str], running: Dict[str, int]) -> dict:
+        """Percentiles per task type and window, blocking: run in a thread"""
+        now = time.time()
+        summary = {}
+        for task_type in task_types:
+            records = self._records(task_type)
+            summary[task_type] = {
+                "running": running.get(task_type, 0),
+                "windows": {name: _window(records, now - seconds, seconds) for name, seconds in WINDOWS.items()},
+            }
+        return summary
+
+
+def _percentiles(values: List[float]) -> Optional[dict]:
+    if not values:
+        return None
+    values = sorted(values)
+    result = {f"p{p}": round(values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))], 3) for p in PERCENTILES}
+    result["max"] = round(values[-1], 3)
+    return result
+
+
+def _window(records: List[tuple], since: float, seconds: int) -> dict:
+    records = [record for record in records if record[0] >= since]
+    statuses = {COMPLETED: 0, FAILED: 0, CHECKPOINTED: 0}
+    steps: Dict[str, List[float]] = {}
+    for _, status, _, _, record_steps in records:
+        statuses[status] = statuses.get(status, 0) + 1
+        for step, duration in record_steps.items():
+            steps.setdefault(step, []).append(duration)
+
+    ended = statuses[COMPLETED] + statuses[FAILED]
+    run_times = [record[3] for record in records]
+    return {
+        "runs": len(records),
+        **statuses,
+        "failure_rate": round(statuses[FAILED] / ended, 4) if ended else None,
+        "queue_wait_seconds": _percentiles([record[2] for record in records]),
+        "run_seconds": _percentiles(run_times),
+        # Average tasks of this type running at once, from the total run time
+        "avg_concurrency": round(sum(run_times) / seconds, 3),
+        "steps": {step: _percentiles(durations) for step, durations in steps.items()},
+    }
+
+
+# Global telemetry instance
+task_telemetry = TaskTelemetry()
@@ -0,0 +1,135 @@
+"""
+Two-tier cache: in-process LRU (L1) in front of the shared diskcache (L2)
+with single-flight misses and soft-TTL background refresh
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, Counter
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+import diskcache as dc
+
+_MISSING = object()
+
+
+class TieredCache:
+    """
+    L1 entries live at most l1_ttl seconds, which bounds how long a worker
+    may serve a value deleted from L2 by another worker. Keys that must
+    change immediately should carry a version instead (see response_cache).
+    """
+
+    instances: List["TieredCache"] = []
+
+    def __init__(self, l2: dc.Cache, name: str, l1_size: int = 1024, l1_ttl: float = 5.0):
+        self.l2 = l2
+        self.name = name
+        self.l1_size = l1_size
+        self.l1_ttl = l1_ttl
+        self._l1: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, soft_deadline, l1_deadline)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refreshes: Set[asyncio.Task] = set()
+        self.metrics = Counter()
+        TieredCache.instances.append(self)
+
+    def _l1_get(self, key: str):
+        entry = self._l1.get(key)
+        if entry is None:
+            return None
+        if entry[2] < time.time():
+            del self._l1[key]
+            return None
+        self._l1.move_to_end(key)
+        return entry
+
+    def _l1_set(self, key: str, value: Any, soft_deadline: float, ttl: float):
+        self._l1[key] = (value, soft_deadline, time.time() + min(self.l1_ttl, ttl))
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_size:
+            self._l1.popitem(last=False)
+            self.metrics["l1_evictions"] += 1
+
+    def _store(self, key: str, value: Any, ttl: float, soft_ttl: float):
+        soft_deadline = time.time() + (soft_ttl if soft_ttl is not None else ttl)
+        self.l2.set(key, (value, soft_deadline), expire=ttl)
+        self._l1_set(key, value, soft_deadline, ttl)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float = 60,
+        soft_ttl: float = None
+    ) -> Any:
+        """
+        Return the cached value or compute it once for all concurrent callers
+
+        Past soft_ttl the stale value is still returned and a single
+        background refresh is started.
+        """
+        entry = self._l1_get(key)
+        if entry is not None:
+            self.metrics["l1_hits"] += 1
+            value, soft_deadline = entry[0], entry[1]
+        else:
+            stored = self.l2.get(key, _MISSING)
+            if stored is _MISSING:
+                # Callers joining an in-flight computation are not misses
+                self.metrics["coalesced" if key in self._inflight else "misses"] += 1
+                return await self._single_flight(key, compute, ttl, soft_ttl)
+            self.metrics["l2_hits"] += 1
+            value, soft_deadline = stored
+            self._l1_set(key, value, soft_deadline, ttl)
+
+        if soft_deadline < time.time() and key not in self._inflight:
+            self.metrics["refreshes"] += 1
+            refresh = asyncio.create_task(self._refresh(key, compute, ttl, soft_ttl))
+            # The loop only keeps weak references to tasks
+            self._refreshes.add(refresh)
+            refresh.add_done_callback(self._refreshes.discard)
+        return value
+
+    async def _single_flight(self, key, compute, ttl, soft_ttl):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, compute, ttl, soft_ttl))
+            # Nobody may be left waiting when it fails
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        # Every caller, the first one included, waits shielded: one going
+        # away (a client disconnecting) does not cancel it for the others
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, compute, ttl, soft_ttl):
+        try:
+            value = await compute()
+            self._store(key, value, ttl, soft_ttl)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _refresh(self, key, compute, ttl, soft_ttl):
+        try:
+            await self._single_flight(key, compute, ttl, soft_ttl)
+        except Exception as e:
+            self.metrics["refresh_errors"] += 1
+            print(f"⚠️ Background refresh of {self.name}:{key} failed: {e}")
+
+    def delete(self, key: str):
+        self._l1.pop(key, None)
+        self.l2.delete(key)
+
+    def stats(self) -> dict:
+        hits = self.metrics["l1_hits"] + self.metrics["l2_hits"]
+        lookups = hits + self.metrics["misses"]
+        return {
+            "name": self.name,
+            "l1_size": len(self._l1),
+            "inflight": len(self._inflight),
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            **{metric: self.metrics[metric] for metric in (
+                "l1_hits", "l2_hits", "misses", "coalesced",
+                "refreshes", "refresh_errors", "l1_evictions"
+            )},
+        }
@@ -0,0 +1,292 @@
+"""
+Lightweight tracing of requests, background tasks and their SQL
+
+Set TRACE_FILE to enable it: every finished span is written there as
+OTLP/JSON (one ExportTraceServiceRequest per line, the format of the
+OpenTelemetry collector's otlpjsonfile receiver), from the same kind of
+background writer as the access log.
+
+A request gets a server span, honouring an incoming W3C `traceparent`
+header, and returns its trace id in X-Trace-Id. `enqueue_task` stores its
+span's traceparent in `Task.input_data["_trace"]`, so the task run, its
+progress updates and SSE broadcasts join the trace of the request that
+created it, on whichever worker claims it. SQL statements become child
+spans of whatever span is current.
+
+Without TRACE_FILE, span() returns right away and no SQL listener is set.
+"""
+
+import contextvars
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.access_log import JsonLineSink
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1"))  # of new traces, incoming ones keep their decision
+SERVICE_NAME = "hosting-panel"
+MAX_BATCH = 256  # spans per exported line
+MAX_STATEMENT = 1000
+
+# OTLP span kinds and status codes
+INTERNAL, SERVER, CLIENT, PRODUCER, CONSUMER = 1, 2, 3, 4, 5
+STATUS_OK, STATUS_ERROR = 1, 2
+
+TRACE_KEY = "_trace"  # key of the traceparent in Task.input_data
+
+enabled = bool(TRACE_FILE)
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "status", "error",
+                 "local_root")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int = INTERNAL, attributes: dict = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.status = None
+        self.error = None
+        self.start = time.time_ns()
+        self.end = None
+        self.local_root = False
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.error = f"{type(error).__name__}: {error}"
+
+    def finish(self):
+        self.end = time.time_ns()
+        exporter.export(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items() if value is not None],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status:
+            span["status"] = {"code": self.status, "message": self.error or ""}
+        return span
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class OTLPFileExporter:
+    """
+    Batches finished spans into OTLP/JSON lines. A batch is written when a
+    local root span (request or task run) ends, or when it is full.
+    """
+
+    def __init__(self, path: str = None):
+        self.sink = JsonLineSink(path)
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()  # SQL spans end on threadpool threads
+        self._resource = {"attributes": [
+            _attribute("service.name", SERVICE_NAME),
+            _attribute("process.pid", os.getpid()),
+        ]}
+
+    def export(self, span: Span):
+        with self._lock:
+            self._pending.append(span)
+            full = len(self._pending) >= MAX_BATCH
+        if full or span.local_root:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans:
+            return
+        # Worker pid, not the pid of the process that imported this module
+        self._resource["attributes"][1] = _attribute("process.pid", os.getpid())
+        self.sink.emit({"resourceSpans": [{
+            "resource": self._resource,
+            "scopeSpans": [{
+                "scope": {"name": SERVICE_NAME},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]})
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+
+exporter = OTLPFileExporter(TRACE_FILE)
+
+
+def parse_traceparent(value: Optional[str]):
+    """(trace_id, parent span id, sampled) of a W3C traceparent, or None"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[1] == "0" * 32:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+def inject(data: Optional[dict]) -> Optional[dict]:
+    """Copy of a task's input data carrying the current traceparent"""
+    span = _current.get()
+    if span is None:
+        return data
+    return {**(data or {}), TRACE_KEY: span.traceparent}
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, root: bool = False, traceparent: str = None, **attributes):
+    """
+    Run the block in a child span of the current one. Without a current
+    span nothing is recorded, unless root is set (requests, task runs):
+    then the span continues `traceparent` when one is given, the current
+    span otherwise, or starts a trace. Yields the span or None.
+    """
+    if not enabled:
+        yield None
+        return
+
+    incoming = parse_traceparent(traceparent) if root else None
+    parent = _current.get()
+    if incoming:
+        trace_id, parent_id, sampled = incoming
+    elif parent is not None:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, True
+    elif root:
+        trace_id, parent_id, sampled = os.urandom(16).hex(), None, random.random() < SAMPLE_RATE
+    else:
+        sampled = False
+    if not sampled:
+        yield None
+        return
+
+    current_span = Span(name, trace_id, parent_id, kind, attributes)
+    current_span.local_root = root
+    token = _current.set(current_span)
+    try:
+        yield current_span
+    except BaseException as e:
+        current_span.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        current_span.finish()
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a server span per request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from src.metrics import route_template
+
+        traceparent = dict(scope["headers"]).get(b"traceparent", b"").decode("latin-1")
+        with span(f"{scope['method']} {scope['path']}", kind=SERVER, root=True, traceparent=traceparent,
+                  **{"http.method": scope["method"], "http.target": scope["path"]}) as request_span:
+            if request_span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    request_span.set(**{"http.status_code": message["status"]})
+                    if message["status"] >= 500:
+                        request_span.status = STATUS_ERROR
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-trace-id", request_span.trace_id.encode())
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                template = route_template(scope)
+                request_span.name = f"{scope['method']} {template}"
+                request_span.set(**{"http.route": template})
+
+
+def _statement_name(statement: str) -> str:
+    """Span name of a statement, e.g. `SELECT tasks`"""
+    verb = statement.split(None, 1)[0].upper() if statement.strip() else "SQL"
+    table = re.search(r"\b(?:FROM|INTO|UPDATE)\s+`?(\w+)", statement, re.IGNORECASE)
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current.get()
+    if parent is not None:
+        context._trace_span = Span(_statement_name(statement), parent.trace_id, parent.span_id, CLIENT, {
+            "db.system": conn.dialect.name,
+            "db.statement": re.sub(r"\s+", " ", statement).strip()[:MAX_STATEMENT],
+        })
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    sql_span = getattr(context, "_trace_span", None)
+    if sql_span is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            sql_span.set(**{"db.rows": cursor.rowcount})
+        sql_span.finish()
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    sql_span = getattr(context, "_trace_span", None) if context is not None else None
+    if sql_span is not None:
+        sql_span.fail(exception_context.original_exception)
+        sql_span.finish()
+
+
+if enabled:
+    # On the class, so that the lazily created engine is covered
+    event.listen(Engine, "before_cursor_execute", _before_execute)
+    event.listen(Engine, "after_cursor_execute", _after_execute)
+    event.listen(Engine, "handle_error", _handle_error)
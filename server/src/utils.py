@@ -17,32 +17,27 @@ def timeFromISO(isodate):
     return(local_dt)
 
 class TimestampedCache(dc.Cache):
+    """Cache storing each value together with the time it was set"""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._timestamp_suffix = '__timestamp__'
-    
     def set(self, key, value, *args, **kwargs):
-        """Set a value and store its timestamp."""
-        # Store the actual value
-        result = super().set(key, value, *args, **kwargs)
-        # Store the timestamp with a special key
-        if result:
-            timestamp_key = f"{key}{self._timestamp_suffix}"
-            super().set(timestamp_key, time.time(), *args, **kwargs)
-        return result
-    
+        """Set a value and its timestamp in a single write."""
+        return super().set(key, (value, time.time()), *args, **kwargs)
+
     def get(self, key, default=None, *args, **kwargs):
         """Get a value without the timestamp."""
-        return super().get(key, default, *args, **kwargs)
-    
+        entry = super().get(key, None, *args, **kwargs)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def get_with_timestamp(self, key, default=None):
+        """Get a (value, timestamp) tuple, or default when missing."""
+        entry = super().get(key, None)
+        if entry is None:
+            return default
+        return entry
+
     def get_timestamp(self, key):
         """Retrieve the timestamp of when the value was last set."""
-        timestamp_key = f"{key}{self._timestamp_suffix}"
-        return super().get(timestamp_key)
-    
-    def delete(self, key, *args, **kwargs):
-        timestamp_key = f"{key}{self._timestamp_suffix}"
-        super().delete(timestamp_key)
-
-        return super().delete(key, *args, **kwargs)
+        entry = super().get(key, None)
+        return entry[1] if entry is not None else None
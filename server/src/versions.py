@@ -0,0 +1,63 @@
+"""
+Per-user collection version counters, used to answer conditional GETs
+without touching the database
+"""
+
+from typing import Iterable
+from uuid import uuid4
+
+from src.utils import cache
+
+# Collections shared by every user (stored under user 0)
+GLOBAL_COLLECTIONS = {"plans"}
+
+EPOCH_KEY = "version:epoch"
+
+
+def _key(user_id: int, collection: str) -> str:
+    if collection in GLOBAL_COLLECTIONS:
+        user_id = 0
+    return f"version:{user_id}:{collection}"
+
+
+def _epoch() -> str:
+    # Changes whenever the cache directory is wiped, so that restarting the
+    # counters from zero can never revive an ETag a client still holds
+    epoch = cache.get(EPOCH_KEY)
+    if epoch is None:
+        cache.add(EPOCH_KEY, uuid4().hex[:8])
+        epoch = cache.get(EPOCH_KEY)
+    return epoch
+
+
+def bump(user_id: int, *collections: str):
+    """Mark collections as changed, call after the write is committed"""
+    for collection in collections:
+        cache.incr(_key(user_id, collection), default=0)
+
+
+def current(user_id: int, collections: Iterable[str]) -> dict:
+    return {c: cache.get(_key(user_id, c), default=0) for c in collections}
+
+
+def etag(user_id: int, collections: Iterable[str]) -> str:
+    """Weak ETag covering the given collections for this user"""
+    versions = current(user_id, collections)
+    parts = ".".join(f"{c}{v}" for c, v in versions.items())
+    return f'W/"{_epoch()}-{user_id}-{parts}"'
+
+
+def etag_matches(if_none_match: str, tag: str) -> bool:
+    """Weak comparison against an If-None-Match header value"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = tag[2:] if tag.startswith("W/") else tag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
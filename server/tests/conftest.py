@@ -0,0 +1,59 @@
+"""
+Fixtures running the app against an in-memory SQLite database
+
+The caches are created in a temporary directory, the MySQL-only rollup
+upsert is disabled.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("ACCESS_LOG_FILE", os.devnull)
+# ./cache is opened at import time
+os.chdir(tempfile.mkdtemp(prefix="hosting-panel-tests-"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from src import database, rollups
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    database.SessionLocal.configure(bind=engine)
+    # INSERT ... ON DUPLICATE KEY UPDATE is MySQL only
+    monkeypatch.setattr(rollups, "apply_deltas", lambda connection, deltas: None)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def user(engine):
+    from src.crypto import AuthService
+    from src.models import User, UserRole
+
+    with database.get_db() as db:
+        user = User(email="user@example.com", role=UserRole.CLIENT, first_name="Test")
+        user.set_password("password1")
+        db.add(user)
+        db.commit()
+        token = AuthService.generate_access_token(user.id, user.email, user.role.value)
+        return {"id": user.id, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+@pytest.fixture
+def client(engine):
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,27 @@
+from src import database
+from src.models import User
+from src.utils import cache
+
+
+def test_conditional_get_stops_answering_disabled_accounts(client, user):
+    response = client.get("/websites", headers=user["headers"])
+    etag = response.headers["etag"]
+    conditional = {**user["headers"], "If-None-Match": etag}
+    assert client.get("/websites", headers=conditional).status_code == 304
+
+    with database.get_db() as db:
+        db.query(User).filter(User.id == user["id"]).update({"is_active": False})
+        db.commit()
+    # The cached flag expires after ACTIVE_FLAG_TTL
+    cache.delete(f"user_active:{user['id']}")
+
+    assert client.get("/websites", headers=conditional).status_code == 403
+    assert client.get("/websites", headers=conditional).status_code == 403
+
+
+def test_conditional_get_without_cached_flag_answers_in_full(client, user):
+    etag = client.get("/websites", headers=user["headers"]).headers["etag"]
+    cache.delete(f"user_active:{user['id']}")
+
+    response = client.get("/websites", headers={**user["headers"], "If-None-Match": etag})
+    assert response.status_code == 200
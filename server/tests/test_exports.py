@@ -0,0 +1,24 @@
+import gzip
+
+import orjson
+
+from src import database
+from src.crypto import AuthService
+from src.models import User, UserRole
+
+
+def test_gzip_export_is_not_encoded_twice(client, user):
+    with database.get_db() as db:
+        db.query(User).filter(User.id == user["id"]).update({"role": UserRole.ADMIN})
+        db.commit()
+    token = AuthService.generate_access_token(user["id"], "user@example.com", UserRole.ADMIN.value)
+
+    response = client.get(
+        "/admin/export/users?gzip=true",
+        headers={"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    rows = [orjson.loads(line) for line in gzip.decompress(response.content).splitlines()]
+    assert [row["email"] for row in rows] == ["user@example.com"]
@@ -0,0 +1,30 @@
+import hashlib
+import threading
+
+from src.concurrency import limiters
+from src.utils import cache
+
+
+def test_duplicates_wait_without_holding_a_slot(client, user):
+    body = b'{"name": "site"}'
+    fingerprint = hashlib.sha256(b"\0".join([b"POST", b"/websites", b"", body])).hexdigest()
+    cache_key = f"idempotency:user:{user['id']}:retry-1"
+    # The first request is still running, on any worker
+    cache.set(cache_key, {"state": "pending", "fingerprint": fingerprint})
+
+    def finish():
+        inflight.append(limiters["writes"].inflight)
+        cache.set(cache_key, {
+            "state": "done", "fingerprint": fingerprint, "status": 201,
+            "headers": [(b"content-type", b"application/json")], "body": b'{"id": 1}',
+        })
+
+    inflight = []
+    admitted = limiters["writes"].metrics["admitted"]
+    threading.Timer(0.3, finish).start()
+    response = client.post("/websites", content=body, headers={**user["headers"], "Idempotency-Key": "retry-1"})
+
+    assert response.status_code == 201
+    assert response.headers["idempotent-replayed"] == "true"
+    assert inflight == [0]
+    assert limiters["writes"].metrics["admitted"] == admitted
@@ -0,0 +1,68 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+
+from conftest import SERVER_DIR
+
+LAUNCHER = textwrap.dedent("""
+    import os, sys
+    from src import launcher
+
+    def record_kill(pid, sig, kill=os.kill):
+        with open(sys.argv[2], "a") as f:
+            f.write(f"{os.getpid()} {pid} {sig}\\n")
+        kill(pid, sig)
+    os.kill = record_kill
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+
+    launcher._prepare_metrics_dir()
+    args = launcher.parse_args(["--host", "127.0.0.1", "--port", sys.argv[1], "--no-ssl", "--max-requests", "0"])
+    launcher._supervise(app, args, 3)
+""")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _workers(master: int) -> list:
+    with open(f"/proc/{master}/task/{master}/children") as f:
+        return f.read().split()
+
+def _accepts(port: int) -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+def test_only_the_master_kills_workers_on_stop(tmp_path):
+    port, kills = _free_port(), tmp_path / "kills"
+    env = dict(os.environ, PYTHONPATH=SERVER_DIR, PROMETHEUS_MULTIPROC_DIR=str(tmp_path / "metrics"))
+    master = subprocess.Popen([sys.executable, "-c", LAUNCHER, str(port), str(kills)], env=env)
+    try:
+        deadline = time.monotonic() + 30
+        while len(_workers(master.pid)) < 3 or not _accepts(port):
+            assert time.monotonic() < deadline, "workers did not start"
+            time.sleep(0.1)
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+    finally:
+        if master.poll() is None:
+            master.kill()
+
+    callers = {int(line.split()[0]) for line in kills.read_text().splitlines()}
+    assert callers == {master.pid}
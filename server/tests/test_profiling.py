@@ -0,0 +1,11 @@
+def test_profile_header_other_than_1_is_served_normally(client, user):
+    response = client.get("/websites", headers={**user["headers"], "X-Profile": "0"})
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_profiling_requires_an_admin(client, user):
+    response = client.get("/websites", headers={**user["headers"], "X-Profile": "1"})
+
+    assert response.status_code == 403
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+from src import database
+from src.models import HostingPlan, Subscription
+
+
+def test_sync_after_subscription_change(client, user):
+    version = client.get("/sync", headers=user["headers"]).json()["version"]
+
+    with database.get_db() as db:
+        plan = HostingPlan(name="Basic", price=999, max_websites=3, storage_gb=10, bandwidth_gb=100)
+        db.add(plan)
+        db.commit()
+        now = datetime.utcnow()
+        subscription = Subscription(
+            user_id=user["id"], plan_id=plan.id,
+            current_period_start=now, current_period_end=now + timedelta(days=30)
+        )
+        db.add(subscription)
+        db.commit()
+        subscription.status = "cancelled"
+        db.commit()
+
+    response = client.get("/sync", params={"since": version}, headers=user["headers"])
+
+    assert response.status_code == 200
+    subscriptions = response.json()["upserts"]["subscriptions"]
+    assert [s["status"] for s in subscriptions] == ["cancelled"]
+    assert subscriptions[0]["plan"]["name"] == "Basic"
@@ -0,0 +1,41 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+from src import database, rollups
+from src.models import Task, TaskStatus, TaskType
+from src.task_queue import task_queue
+from src.task_telemetry import task_telemetry
+
+
+def test_claim_moves_rollups_from_pending_to_running(engine, user, monkeypatch):
+    with database.get_db() as db:
+        task = Task(user_id=user["id"], task_type=TaskType.BACKUP_CREATE, status=TaskStatus.PENDING, title="Backup")
+        db.add(task)
+        db.commit()
+        task_id = task.id
+
+    deltas = Counter()
+    monkeypatch.setattr(rollups, "apply_deltas", lambda connection, changes: deltas.update(changes))
+    with database.get_db() as db:
+        claimed = task_queue._claim(db, task_id)
+
+    assert claimed.status == TaskStatus.RUNNING
+    assert +deltas == Counter({("tasks.status", "RUNNING"): 1})
+    assert deltas[("tasks.status", "PENDING")] == -1
+
+
+def test_checkpointed_task_waits_from_its_checkpoint(engine, user):
+    created = datetime.utcnow() - timedelta(hours=2)
+    with database.get_db() as db:
+        task = Task(user_id=user["id"], task_type=TaskType.BACKUP_CREATE, status=TaskStatus.RUNNING,
+                    title="Backup", created_at=created, queued_at=created, started_at=created)
+        db.add(task)
+        db.commit()
+        task_id = task.id
+
+    asyncio.run(task_queue._checkpoint(task_id))
+    with database.get_db() as db:
+        task_telemetry.started(task_queue._claim(db, task_id))
+
+    assert task_telemetry.runs.pop(task_id).wait < 60
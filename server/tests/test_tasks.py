@@ -0,0 +1,13 @@
+from src.task_queue import task_queue
+
+
+def test_event_stream_is_not_gzipped(client, user, monkeypatch):
+    # Draining: the stream ends after the snapshot instead of waiting for updates
+    monkeypatch.setattr(task_queue, "accepting", False)
+
+    response = client.get("/tasks/tasks/stream/events", headers={**user["headers"], "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    assert b"event: draining" in response.content
@@ -0,0 +1,28 @@
+import asyncio
+
+import diskcache as dc
+
+from src.tiered_cache import TieredCache
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_ones(tmp_path):
+    cache = TieredCache(dc.Cache(str(tmp_path)), "test")
+    computed = 0
+
+    async def compute():
+        nonlocal computed
+        computed += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def scenario():
+        first = asyncio.create_task(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(scenario()) == ("value", True)
+    assert computed == 1
+    assert cache.l2.get("key")[0] == "value"